@@ -1,209 +1,756 @@
 import os
+import sys
 import time
+import asyncio
+import atexit
 import json
-import csv
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-import yfinance as yf
+import re
+import threading
+import functools
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
+import numpy as np
 from curl_cffi import requests
 import boto3
 from botocore.exceptions import ClientError
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; NumPy is used without it
+    njit = None
+    prange = range
+
+# Yahoo v8 chart endpoint used for batch fetches
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{}"
+
+# Maximum number of chart requests in flight at once
+FETCH_CONCURRENCY = int(os.environ.get('FETCH_CONCURRENCY', 20))
+
+# Symbols per block of progress output written by analyze_stocks
+PROGRESS_FLUSH_EVERY = 100
+
+# The only columns the pattern analyzers read
+PRICE_COLUMNS = ['High', 'Low', 'Close']
+
+# Recent prices as a (days, 3) High/Low/Close array, oldest row first,
+# paired with yesterday's date (the day patterns are reported for)
+PriceWindow = Tuple[np.ndarray, str]
+
+# Request budget shared by all fetches. Yahoo starts returning 429s above
+# roughly 60 requests per minute, which also caps throughput: 1000 symbols
+# take about 17 minutes at the default rate.
+REQUESTS_PER_MINUTE = float(os.environ.get('REQUESTS_PER_MINUTE', 60))
+
+# Retries after a rate-limit response, with exponential backoff
+MAX_RATE_LIMIT_RETRIES = 3
+
+# curl_cffi sessions reused so connections stay alive across requests and
+# warm Lambda invocations. The async session is bound to _loop, which batch
+# fetches keep running on instead of a fresh asyncio.run loop each time.
+_session = None
+_async_session = None
+_loop = None
+
+# Optional stock data cache: Redis if REDIS_URL is set, otherwise files in
+# STOCK_CACHE_DIR (e.g. /tmp on Lambda). Caching is off when neither is set.
+REDIS_URL = os.environ.get('REDIS_URL')
+STOCK_CACHE_DIR = os.environ.get('STOCK_CACHE_DIR')
+CACHE_TTL_SECONDS = 3600
+
+# Only symbols like these are cached; anything else (e.g. containing '/')
+# could escape STOCK_CACHE_DIR when used in a file name
+_CACHEABLE_SYMBOL = re.compile(r'[A-Za-z0-9.^=-]{1,20}')
+
+_redis_client = None
+
+# In-process LRU in front of Redis/files so warm Lambda containers skip the
+# round-trip for symbols seen in the last few minutes
+L1_CACHE_SIZE = 512
+L1_CACHE_TTL_SECONDS = 600
+_l1_cache: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+_l1_lock = threading.Lock()
+
+# SNS client reused across warm Lambda invocations
+_sns_client = None
+
 
 def add_request_delay(delay_seconds: float = 1.0) -> None:
     """Add delay between requests to avoid rate limiting."""
     time.sleep(delay_seconds)
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    each request consumes one token and waits if none are available.
+    The rate halves when the server rate-limits us and climbs back to
+    `base_rate` as requests succeed again.
+    """
+
+    def __init__(self, rate: float = REQUESTS_PER_MINUTE / 60,
+                 capacity: int = 10, min_rate: float = 0.05):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if available; otherwise return seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self._last) * self.rate
+            self._tokens = min(self.capacity, self._tokens + refill)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Take one token without blocking the event loop."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def slow_down(self) -> None:
+        """Halve the refill rate after the server rate-limits us."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self) -> None:
+        """Step the refill rate back toward base_rate after a success."""
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+# Shared limiter for all Yahoo requests
+_BUCKET = TokenBucket()
+
+
+def _get_session() -> requests.Session:
+    """Return the shared Chrome-impersonating session."""
+    global _session
+    if _session is None:
+        _session = requests.Session(impersonate="chrome110")
+    return _session
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop batch fetches run on, creating it if needed."""
+    global _loop, _async_session
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        _async_session = None  # Bound to the old loop
+    return _loop
+
+
+@atexit.register
+def _close_loop() -> None:
+    """Close the async session and its loop when the process exits."""
+    if _loop is None or _loop.is_closed():
+        return
+    if _async_session is not None:
+        _loop.run_until_complete(_async_session.close())
+    _loop.close()
+
+
+def _get_async_session() -> requests.AsyncSession:
+    """Return the shared async session; call it on the _get_loop() loop."""
+    global _async_session
+    if _async_session is None:
+        _async_session = requests.AsyncSession(impersonate="chrome110")
+    return _async_session
+
+
+def _cache_key(symbol: str, days: int, kind: str) -> str:
+    """Cache key for a symbol's data, bucketed by calendar hour."""
+    now = datetime.now()
+    return (f"v3:stock:{kind}:{symbol}:{days}:"
+            f"{now.date().isoformat()}:{now.hour}")
+
+
+def _get_redis():
+    """Return the shared Redis client, connecting on first use."""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+def _cache_file(key: str) -> str:
+    """File path used to store a cache key in STOCK_CACHE_DIR."""
+    return os.path.join(STOCK_CACHE_DIR, key.replace(':', '_') + '.json')
+
+
+def _encode_cached(data: Any) -> str:
+    """Serialize a PriceWindow or DataFrame as JSON for the cache."""
+    if isinstance(data, pd.DataFrame):
+        return json.dumps({
+            'index': data.index.asi8.tolist(),
+            'index_dtype': str(data.index.dtype),
+            'columns': {column: values.tolist()
+                        for column, values in data.items()}
+        })
+    prices, date = data
+    return json.dumps({'prices': prices.tolist(), 'date': date})
+
+
+def _decode_cached(blob: Any) -> Any:
+    """Rebuild a PriceWindow or DataFrame from its cached JSON."""
+    data = json.loads(blob)
+    if 'index' in data:
+        index = np.array(data['index'], dtype=data['index_dtype'])
+        return pd.DataFrame(data['columns'], index=pd.DatetimeIndex(index))
+    return np.array(data['prices'], dtype=float), data['date']
+
+
+def _l1_get(key: str, ttl: int) -> Optional[Any]:
+    """Return a fresh in-process cache entry, or None."""
+    with _l1_lock:
+        entry = _l1_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, data = entry
+        if time.time() - stored_at > min(ttl, L1_CACHE_TTL_SECONDS):
+            del _l1_cache[key]
+            return None
+        _l1_cache.move_to_end(key)
+        return data
+
+
+def _l1_put(key: str, data: Any) -> None:
+    """Add an entry to the in-process cache, evicting the oldest."""
+    with _l1_lock:
+        _l1_cache[key] = (time.time(), data)
+        _l1_cache.move_to_end(key)
+        if len(_l1_cache) > L1_CACHE_SIZE:
+            _l1_cache.popitem(last=False)
+
+
+def load_cached_stock_data(symbol: str, days: int = 3,
+                           ttl: int = CACHE_TTL_SECONDS,
+                           kind: str = 'window') -> Optional[Any]:
+    """
+    Return cached stock data for a symbol, or None on a cache miss.
+
+    `kind` separates value types cached for the same symbol, e.g.
+    PriceWindows ('window') and DataFrames ('frame'). Hits are served from
+    the in-process cache first, then Redis or STOCK_CACHE_DIR.
+    """
+    if (not (REDIS_URL or STOCK_CACHE_DIR)
+            or not _CACHEABLE_SYMBOL.fullmatch(symbol)):
+        return None
+
+    key = _cache_key(symbol, days, kind)
+    data = _l1_get(key, ttl)
+    if data is not None:
+        return data
+
+    try:
+        if REDIS_URL:
+            blob = _get_redis().get(key)
+        else:
+            path = _cache_file(key)
+            if (not os.path.exists(path)
+                    or time.time() - os.path.getmtime(path) > ttl):
+                return None
+            with open(path) as f:
+                blob = f.read()
+
+        if not blob:
+            return None
+        data = _decode_cached(blob)
+        _l1_put(key, data)
+        return data
+
+    except Exception as e:
+        print(f"⚠️ Cache read failed for {symbol}: {str(e)}")
+        return None
+
+
+def store_cached_stock_data(symbol: str, data: Any, days: int = 3,
+                            ttl: int = CACHE_TTL_SECONDS,
+                            kind: str = 'window') -> None:
+    """Store stock data for a symbol in the configured cache."""
+    if (not (REDIS_URL or STOCK_CACHE_DIR)
+            or not _CACHEABLE_SYMBOL.fullmatch(symbol)):
+        return
+
+    key = _cache_key(symbol, days, kind)
+    _l1_put(key, data)
+    try:
+        if REDIS_URL:
+            _get_redis().setex(key, ttl, _encode_cached(data))
+        else:
+            os.makedirs(STOCK_CACHE_DIR, exist_ok=True)
+            with open(_cache_file(key), 'w') as f:
+                f.write(_encode_cached(data))
+
+    except Exception as e:
+        print(f"⚠️ Cache write failed for {symbol}: {str(e)}")
+
+
+def memoize(ttl: int = CACHE_TTL_SECONDS, kind: str = 'frame'):
+    """Cache-aside decorator for per-symbol stock data fetchers."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(symbol: str, days: int = 3) -> Optional[pd.DataFrame]:
+            data = load_cached_stock_data(symbol, days, ttl, kind)
+            if data is None:
+                data = func(symbol, days)
+                if data is not None:
+                    store_cached_stock_data(symbol, data, days, ttl, kind)
+            return data
+        return wrapper
+    return decorator
+
+
+@memoize()
 def get_stock_data(symbol: str, days: int = 3) -> Optional[pd.DataFrame]:
     """
-    Fetch stock data using yfinance with curl_cffi for browser simulation.
+    Fetch stock data from Yahoo's chart API with curl_cffi browser simulation.
 
     Args:
         symbol: Stock symbol (e.g., 'AAPL')
         days: Number of days of data to fetch (default 3 for algorithm)
 
     Returns:
-        DataFrame with stock data or None if failed
+        DataFrame with High/Low/Close data or None if failed
     """
     try:
-        # Use curl_cffi session to simulate Chrome browser
-        session = requests.Session(impersonate="chrome110")
-
-        # Create yfinance ticker with custom session
-        ticker = yf.Ticker(symbol)
-        ticker.session = session
-
-        # Calculate date range
-        end_date = datetime.now()
-        # Extra days for weekends
-        start_date = end_date - timedelta(days=days + 5)
-
-        # Fetch historical data
-        data = ticker.history(start=start_date, end=end_date)
-
-        if data.empty:
+        session = _get_session()
+
+        # Fetch the chart, backing off if Yahoo rate-limits us
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            _BUCKET.acquire()
+            response = session.get(CHART_URL.format(symbol),
+                                   params=_chart_params(days))
+            if response.status_code != 429:
+                _BUCKET.speed_up()
+                break
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                print(f"❌ Rate limited fetching {symbol}, giving up")
+                return None
+            print(f"⚠️ Rate limited fetching {symbol}, backing off...")
+            _BUCKET.slow_down()
+            add_request_delay(min(60, 2 ** attempt))
+
+        chart = parse_chart_json(response.json())
+        if chart is None:
             print(f"❌ No data available for {symbol}")
             return None
 
-        # Get the most recent trading days
-        recent_data = data.tail(days)
-
-        if len(recent_data) < days:
-            print(f"⚠️ Insufficient data for {symbol}: "
-                  f"only {len(recent_data)} days available")
-            return recent_data if len(recent_data) >= 3 else None
+        prices, timestamps = chart
+        window = _recent_window(symbol, prices, timestamps, days)
+        if window is None:
+            return None
 
-        return recent_data
+        prices = window[0]
+        index = pd.to_datetime(timestamps[-len(prices):], unit='s')
+        return pd.DataFrame(prices, index=index, columns=PRICE_COLUMNS)
 
     except Exception as e:
         print(f"❌ Error fetching data for {symbol}: {str(e)}")
         return None
 
 
-def analyze_local_extreme_highs(
-    data: pd.DataFrame
-) -> Optional[Dict[str, Any]]:
+def _chart_params(days: int) -> Dict[str, Any]:
+    """Chart API query covering `days` trading days plus weekends."""
+    end_date = datetime.now()
+    return {
+        'period1': int((end_date - timedelta(days=days + 7)).timestamp()),
+        'period2': int(end_date.timestamp()),
+        'interval': '1d'
+    }
+
+
+def parse_chart_json(
+    payload: Dict[str, Any]
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
     """
-    Analyze if previous day shows a local extreme high pattern.
-    Local Extreme High: Yesterday's high > max(today's high, 2-days-ago high)
+    Convert a Yahoo v8 chart response into numpy price arrays.
 
     Returns:
-        Dict with analysis results or None if insufficient data
+        Tuple of an (n, 3) High/Low/Close array and the matching bar
+        timestamps in exchange-local epoch seconds, or None if the
+        response has no data
     """
-    if len(data) < 3:
+    result = (payload.get('chart') or {}).get('result')
+    if not result or not result[0].get('timestamp'):
         return None
 
-    # Get the last 3 days (today, yesterday, 2 days ago)
-    recent_days = data.tail(3)
+    result = result[0]
+    quote = result['indicators']['quote'][0]
+    prices = np.array([quote['high'], quote['low'], quote['close']],
+                      dtype=float).T
+    timestamps = (np.array(result['timestamp'], dtype=np.int64)
+                  + result['meta'].get('gmtoffset', 0))
 
-    today_high = recent_days.iloc[-1]['High']
-    yesterday_high = recent_days.iloc[-2]['High']
-    two_days_ago_high = recent_days.iloc[-3]['High']
-    yesterday_close = recent_days.iloc[-2]['Close']
+    # Yahoo reports missing bars as nulls
+    has_data = ~np.isnan(prices).all(axis=1)
+    return prices[has_data], timestamps[has_data]
 
-    # Check local extreme high condition
-    is_local_extreme_high = yesterday_high > max(today_high, two_days_ago_high)
 
-    if not is_local_extreme_high:
+def _recent_window(symbol: str, prices: np.ndarray, timestamps: np.ndarray,
+                   days: int) -> Optional[PriceWindow]:
+    """Trim parsed chart data to a PriceWindow of the latest days."""
+    if not len(prices):
+        print(f"❌ No data available for {symbol}")
         return None
 
-    return {
-        'type': 'local_extreme_high',
-        'close_price': yesterday_close,
-        'high_price': yesterday_high,
-        'date': recent_days.index[-2].strftime('%Y-%m-%d')
-    }
+    prices = prices[-days:]
 
+    if len(prices) < days:
+        print(f"⚠️ Insufficient data for {symbol}: "
+              f"only {len(prices)} days available")
+        if len(prices) < 3:
+            return None
 
-def analyze_local_close_highs(data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    date = datetime.fromtimestamp(int(timestamps[-2]), timezone.utc)
+    return prices, date.strftime('%Y-%m-%d')
+
+
+async def _fetch_chart(session: requests.AsyncSession, symbol: str,
+                       days: int, semaphore: asyncio.Semaphore
+                       ) -> Tuple[str, Optional[PriceWindow]]:
+    """Fetch one symbol's chart, backing off if Yahoo rate-limits us."""
+    params = _chart_params(days)
+
+    async with semaphore:
+        try:
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                await _BUCKET.acquire_async()
+                response = await session.get(CHART_URL.format(symbol),
+                                             params=params)
+                if response.status_code != 429:
+                    _BUCKET.speed_up()
+                    break
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    print(f"❌ Rate limited fetching {symbol}, giving up")
+                    return symbol, None
+                print(f"⚠️ Rate limited fetching {symbol}, backing off...")
+                _BUCKET.slow_down()
+                await asyncio.sleep(min(60, 2 ** attempt))
+
+            chart = parse_chart_json(response.json())
+
+        except Exception as e:
+            print(f"❌ Error fetching data for {symbol}: {str(e)}")
+            return symbol, None
+
+    if chart is None:
+        print(f"❌ No data available for {symbol}")
+        return symbol, None
+
+    return symbol, _recent_window(symbol, *chart, days)
+
+
+async def fetch_batch(symbols: List[str],
+                      days: int = 3) -> Dict[str, PriceWindow]:
     """
-    Analyze if previous day shows a local close high pattern.
-    Local Close High: Yesterday's close > max(today's close, 2-days-ago close)
+    Fetch stock data for many symbols concurrently from the chart API.
+
+    Args:
+        symbols: Stock symbols to fetch
+        days: Number of days of data to fetch per symbol
 
     Returns:
-        Dict with analysis results or None if insufficient data
+        Dict mapping symbol to PriceWindow; failed symbols are omitted
     """
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    session = _get_async_session()
+    fetched = await asyncio.gather(*(
+        _fetch_chart(session, symbol, days, semaphore)
+        for symbol in symbols
+    ))
+    return {symbol: data for symbol, data in fetched if data is not None}
+
+
+def get_stock_data_batch(symbols: List[str],
+                         days: int = 3) -> Dict[str, PriceWindow]:
+    """
+    Fetch stock data for many symbols, using the cache where possible.
+
+    Args:
+        symbols: Stock symbols to fetch
+        days: Number of days of data to fetch per symbol
+
+    Returns:
+        Dict mapping symbol to PriceWindow; failed symbols are omitted
+    """
+    stock_data = {}
+
+    # Serve what we can from the cache and only download the rest
+    missing = []
+    for symbol in symbols:
+        data = load_cached_stock_data(symbol, days)
+        if data is not None:
+            stock_data[symbol] = data
+        else:
+            missing.append(symbol)
+
+    if missing:
+        fetched = _get_loop().run_until_complete(fetch_batch(missing, days))
+        for symbol, data in fetched.items():
+            store_cached_stock_data(symbol, data, days)
+        stock_data.update(fetched)
+
+    return stock_data
+
+
+# Pattern types in the order they are reported, with console markers
+PATTERN_MARKERS = {
+    'local_extreme_high': '📈E',
+    'local_close_high': '📈C',
+    'local_extreme_low': '📉E',
+    'local_close_low': '📉C',
+}
+
+# One detected pattern. high_price is set only for extreme highs and
+# low_price only for extreme lows; symbol is None for single-stock analysis.
+Pattern = namedtuple('Pattern',
+                     'type symbol close_price date high_price low_price',
+                     defaults=(None, None))
+
+
+def pattern_to_dict(pattern: Pattern) -> Dict[str, Any]:
+    """Convert a Pattern to its JSON dict, omitting unset fields."""
+    return {key: value for key, value in pattern._asdict().items()
+            if value is not None}
+
+
+def price_window(data: pd.DataFrame) -> Optional[PriceWindow]:
+    """Convert a stock DataFrame into a PriceWindow, or None if too short."""
     if len(data) < 3:
         return None
+    return (data[PRICE_COLUMNS].to_numpy(),
+            data.index[-2].strftime('%Y-%m-%d'))
 
-    # Get the last 3 days (today, yesterday, 2 days ago)
-    recent_days = data.tail(3)
 
-    today_close = recent_days.iloc[-1]['Close']
-    yesterday_close = recent_days.iloc[-2]['Close']
-    two_days_ago_close = recent_days.iloc[-3]['Close']
+def detect_patterns(data: pd.DataFrame) -> List[Pattern]:
+    """
+    Detect all four local high/low patterns for yesterday in one pass.
+
+    Returns:
+        List of Patterns (empty if none found or insufficient data)
+    """
+    window = price_window(data)
+    return detect_window_patterns(*window) if window else []
+
+
+def detect_window_patterns(arr: np.ndarray, date: str) -> List[Pattern]:
+    """
+    Detect all four local high/low patterns from a PriceWindow.
 
-    # Check local close high condition
-    is_local_close_high = yesterday_close > max(
-        today_close, two_days_ago_close
+    Args:
+        arr: High/Low/Close rows, oldest first (at least 3 rows)
+        date: Yesterday's date, used for every reported pattern
+
+    Returns:
+        List of Patterns (empty if none found)
+    """
+    # Oldest first: 2 days ago, yesterday, today
+    ((two_days_ago_high, two_days_ago_low, two_days_ago_close),
+     (yesterday_high, yesterday_low, yesterday_close),
+     (today_high, today_low, today_close)) = arr[-3:]
+
+    flags = (
+        yesterday_high > today_high and yesterday_high > two_days_ago_high,
+        yesterday_close > today_close and yesterday_close > two_days_ago_close,
+        yesterday_low < today_low and yesterday_low < two_days_ago_low,
+        yesterday_close < today_close and yesterday_close < two_days_ago_close
     )
+    return analyze_all(flags, yesterday_high, yesterday_low,
+                       yesterday_close, date)
 
-    if not is_local_close_high:
-        return None
 
-    return {
-        'type': 'local_close_high',
-        'close_price': yesterday_close,
-        'date': recent_days.index[-2].strftime('%Y-%m-%d')
-    }
+def analyze_all(flags, high: float, low: float, close: float, date: str,
+                symbol: Optional[str] = None) -> List[Pattern]:
+    """
+    Build the Patterns for one symbol's detected patterns.
 
+    Args:
+        flags: Extreme high, close high, extreme low and close low flags
+        high: Yesterday's high
+        low: Yesterday's low
+        close: Yesterday's close
+        date: Yesterday's date
+        symbol: Stock symbol to tag results with, if any
 
-def analyze_local_extreme_lows(data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    Returns:
+        Zero to four Patterns in PATTERN_MARKERS order
     """
-    Analyze if previous day shows a local extreme low pattern.
-    Local Extreme Low: Yesterday's low < min(today's low, 2-days-ago low)
+    extreme_high, close_high, extreme_low, close_low = flags
+    close = float(close)
+
+    patterns = []
+    if extreme_high:
+        patterns.append(Pattern('local_extreme_high', symbol, close, date,
+                                high_price=float(high)))
+    if close_high:
+        patterns.append(Pattern('local_close_high', symbol, close, date))
+    if extreme_low:
+        patterns.append(Pattern('local_extreme_low', symbol, close, date,
+                                low_price=float(low)))
+    if close_low:
+        patterns.append(Pattern('local_close_low', symbol, close, date))
+    return patterns
+
+
+def _pattern_kernel(arr: np.ndarray, hits: np.ndarray) -> None:
+    """Fill hits[i] with the four pattern flags for symbol i of arr."""
+    for i in prange(arr.shape[0]):
+        h2, h1, h0 = arr[i, 0, 0], arr[i, 1, 0], arr[i, 2, 0]
+        l2, l1, l0 = arr[i, 0, 1], arr[i, 1, 1], arr[i, 2, 1]
+        c2, c1, c0 = arr[i, 0, 2], arr[i, 1, 2], arr[i, 2, 2]
+        hits[i, 0] = h1 > h0 and h1 > h2
+        hits[i, 1] = c1 > c0 and c1 > c2
+        hits[i, 2] = l1 < l0 and l1 < l2
+        hits[i, 3] = c1 < c0 and c1 < c2
+
+
+if njit is not None:
+    # Compiled on first use; cache=True keeps the machine code on disk
+    _pattern_kernel = njit(parallel=True, cache=True)(_pattern_kernel)
+
+
+def _pattern_hits(arr: np.ndarray) -> np.ndarray:
+    """
+    Evaluate the four patterns for a stacked (N, 3, 3) price array.
 
     Returns:
-        Dict with analysis results or None if insufficient data
+        (N, 4) boolean array with one column per type in PATTERN_MARKERS
+        order
     """
-    if len(data) < 3:
-        return None
+    if njit is not None:
+        hits = np.zeros((arr.shape[0], 4), dtype=np.bool_)
+        _pattern_kernel(np.ascontiguousarray(arr, dtype=np.float64), hits)
+        return hits
+
+    highs, lows, closes = arr[:, :, 0], arr[:, :, 1], arr[:, :, 2]
+    return np.column_stack([
+        highs[:, 1] > np.maximum(highs[:, 2], highs[:, 0]),
+        closes[:, 1] > np.maximum(closes[:, 2], closes[:, 0]),
+        lows[:, 1] < np.minimum(lows[:, 2], lows[:, 0]),
+        closes[:, 1] < np.minimum(closes[:, 2], closes[:, 0]),
+    ])
+
+
+def analyze_patterns_batch(
+    stock_data: Dict[str, PriceWindow]
+) -> List[Pattern]:
+    """
+    Detect local high/low patterns for many symbols at once.
 
-    # Get the last 3 days (today, yesterday, 2 days ago)
-    recent_days = data.tail(3)
+    Stacks the last three High/Low/Close rows of every symbol into one
+    (N, 3, 3) array and evaluates each pattern as a vector comparison
+    across all symbols.
 
-    today_low = recent_days.iloc[-1]['Low']
-    yesterday_low = recent_days.iloc[-2]['Low']
-    two_days_ago_low = recent_days.iloc[-3]['Low']
-    yesterday_close = recent_days.iloc[-2]['Close']
+    Args:
+        stock_data: Dict mapping symbol to its PriceWindow
 
-    # Check local extreme low condition
-    is_local_extreme_low = yesterday_low < min(today_low, two_days_ago_low)
+    Returns:
+        Patterns tagged with their symbol, ordered by symbol then type
+    """
+    symbols = [symbol for symbol, (arr, _) in stock_data.items()
+               if len(arr) >= 3]
+    if not symbols:
+        return []
 
-    if not is_local_extreme_low:
-        return None
+    # Axes: symbol, day (2 days ago, yesterday, today), column (H, L, C)
+    arr = np.stack([stock_data[symbol][0][-3:] for symbol in symbols])
+    hits = _pattern_hits(arr)
 
-    return {
-        'type': 'local_extreme_low',
-        'close_price': yesterday_close,
-        'low_price': yesterday_low,
-        'date': recent_days.index[-2].strftime('%Y-%m-%d')
-    }
+    # Build results only for symbols with at least one pattern
+    yesterday = arr[:, 1, :].tolist()
+    patterns = []
+    for row in np.flatnonzero(hits.any(axis=1)):
+        symbol = symbols[row]
+        patterns.extend(analyze_all(hits[row], *yesterday[row],
+                                    stock_data[symbol][1], symbol))
 
+    return patterns
 
-def analyze_local_close_lows(data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+
+def _find_pattern(data: pd.DataFrame,
+                  pattern_type: str) -> Optional[Dict[str, Any]]:
+    """Return the detected pattern of the given type as a dict, if any."""
+    for pattern in detect_patterns(data):
+        if pattern.type == pattern_type:
+            return pattern_to_dict(pattern)
+    return None
+
+
+def analyze_local_extreme_highs(
+    data: pd.DataFrame
+) -> Optional[Dict[str, Any]]:
     """
-    Analyze if previous day shows a local close low pattern.
-    Local Close Low: Yesterday's close < min(today's close, 2-days-ago close)
+    Analyze if previous day shows a local extreme high pattern.
+    Local Extreme High: Yesterday's high > max(today's high, 2-days-ago high)
 
     Returns:
         Dict with analysis results or None if insufficient data
     """
-    if len(data) < 3:
-        return None
+    return _find_pattern(data, 'local_extreme_high')
 
-    # Get the last 3 days (today, yesterday, 2 days ago)
-    recent_days = data.tail(3)
 
-    today_close = recent_days.iloc[-1]['Close']
-    yesterday_close = recent_days.iloc[-2]['Close']
-    two_days_ago_close = recent_days.iloc[-3]['Close']
+def analyze_local_close_highs(data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Analyze if previous day shows a local close high pattern.
+    Local Close High: Yesterday's close > max(today's close, 2-days-ago close)
 
-    # Check local close low condition
-    is_local_close_low = yesterday_close < min(today_close, two_days_ago_close)
+    Returns:
+        Dict with analysis results or None if insufficient data
+    """
+    return _find_pattern(data, 'local_close_high')
 
-    if not is_local_close_low:
-        return None
 
-    return {
-        'type': 'local_close_low',
-        'close_price': yesterday_close,
-        'date': recent_days.index[-2].strftime('%Y-%m-%d')
-    }
+def analyze_local_extreme_lows(data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Analyze if previous day shows a local extreme low pattern.
+    Local Extreme Low: Yesterday's low < min(today's low, 2-days-ago low)
+
+    Returns:
+        Dict with analysis results or None if insufficient data
+    """
+    return _find_pattern(data, 'local_extreme_low')
+
+
+def analyze_local_close_lows(data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Analyze if previous day shows a local close low pattern.
+    Local Close Low: Yesterday's close < min(today's close, 2-days-ago close)
+
+    Returns:
+        Dict with analysis results or None if insufficient data
+    """
+    return _find_pattern(data, 'local_close_low')
 
 
 def read_stock_symbols_csv(file_path: str = 'stock_symbols.csv') -> List[str]:
     """Read stock symbols from CSV file."""
-    symbols = []
     try:
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if 'symbol' in row:
-                    symbols.append(row['symbol'].strip().upper())
-        return symbols
+        symbols = pd.read_csv(file_path, usecols=['symbol'],
+                              dtype=str)['symbol'].dropna()
+        return symbols.str.strip().str.upper().tolist()
     except FileNotFoundError:
         print(f"❌ Stock symbols file not found: {file_path}")
         return []
@@ -212,7 +759,15 @@ def read_stock_symbols_csv(file_path: str = 'stock_symbols.csv') -> List[str]:
         return []
 
 
-def format_results_pretty(results: List[Dict[str, Any]]) -> None:
+def _partition(results: List[Pattern]) -> Dict[str, List[Pattern]]:
+    """Group results by pattern type in a single pass."""
+    buckets = defaultdict(list)
+    for result in results:
+        buckets[result.type].append(result)
+    return buckets
+
+
+def format_results_pretty(results: List[Pattern]) -> None:
     """Format and print results in an attractive console format."""
     if not results:
         print("📊 No local highs or lows detected today.")
@@ -222,19 +777,20 @@ def format_results_pretty(results: List[Dict[str, Any]]) -> None:
     print("📈 DAILY HIGH LOW STOCK ANALYSIS RESULTS")
     print("=" * 80)
 
-    extreme_highs = [r for r in results if r['type'] == 'local_extreme_high']
-    close_highs = [r for r in results if r['type'] == 'local_close_high']
-    extreme_lows = [r for r in results if r['type'] == 'local_extreme_low']
-    close_lows = [r for r in results if r['type'] == 'local_close_low']
+    buckets = _partition(results)
+    extreme_highs = buckets['local_extreme_high']
+    close_highs = buckets['local_close_high']
+    extreme_lows = buckets['local_extreme_low']
+    close_lows = buckets['local_close_low']
 
     if extreme_highs:
         print("\n🔺 LOCAL EXTREME HIGHS:")
         print("-" * 50)
         for result in extreme_highs:
-            symbol = result['symbol']
-            close = result['close_price']
-            high = result['high_price']
-            date = result['date']
+            symbol = result.symbol
+            close = result.close_price
+            high = result.high_price
+            date = result.date
 
             print(f"  {symbol:6} | {date} | Close: ${close:8.2f} | "
                   f"High: ${high:8.2f}")
@@ -245,9 +801,9 @@ def format_results_pretty(results: List[Dict[str, Any]]) -> None:
         print("\n📊 LOCAL CLOSE HIGHS:")
         print("-" * 50)
         for result in close_highs:
-            symbol = result['symbol']
-            close = result['close_price']
-            date = result['date']
+            symbol = result.symbol
+            close = result.close_price
+            date = result.date
 
             print(f"  {symbol:6} | {date} | Close: ${close:8.2f}")
             print("         | Type: Yesterday's close > max(today, "
@@ -258,10 +814,10 @@ def format_results_pretty(results: List[Dict[str, Any]]) -> None:
         print("\n🔻 LOCAL EXTREME LOWS:")
         print("-" * 50)
         for result in extreme_lows:
-            symbol = result['symbol']
-            close = result['close_price']
-            low = result['low_price']
-            date = result['date']
+            symbol = result.symbol
+            close = result.close_price
+            low = result.low_price
+            date = result.date
 
             print(f"  {symbol:6} | {date} | Close: ${close:8.2f} | "
                   f"Low: ${low:8.2f}")
@@ -272,9 +828,9 @@ def format_results_pretty(results: List[Dict[str, Any]]) -> None:
         print("\n📉 LOCAL CLOSE LOWS:")
         print("-" * 50)
         for result in close_lows:
-            symbol = result['symbol']
-            close = result['close_price']
-            date = result['date']
+            symbol = result.symbol
+            close = result.close_price
+            date = result.date
 
             print(f"  {symbol:6} | {date} | Close: ${close:8.2f}")
             print("         | Type: Yesterday's close < min(today, "
@@ -290,16 +846,29 @@ def format_results_pretty(results: List[Dict[str, Any]]) -> None:
     print(f"📊 Total patterns detected: {total_patterns}")
 
 
-def format_results_json(results: List[Dict[str, Any]]) -> str:
-    """Format results as JSON for Lambda/SNS output."""
-    extreme_highs = [r for r in results if r['type'] == 'local_extreme_high']
-    close_highs = [r for r in results if r['type'] == 'local_close_high']
-    extreme_lows = [r for r in results if r['type'] == 'local_extreme_low']
-    close_lows = [r for r in results if r['type'] == 'local_close_low']
+def format_results_json(results: List[Pattern]) -> str:
+    """
+    Format results as JSON for Lambda/SNS output.
+
+    Args:
+        results: Pattern results from analyze_stocks
+    """
+    buckets = _partition(results)
+    # Patterns become dicts only here, at the serialization boundary
+    extreme_highs = [pattern_to_dict(p) for p in buckets['local_extreme_high']]
+    close_highs = [pattern_to_dict(p) for p in buckets['local_close_high']]
+    extreme_lows = [pattern_to_dict(p) for p in buckets['local_extreme_low']]
+    close_lows = [pattern_to_dict(p) for p in buckets['local_close_low']]
+
+    # Compact output on Lambda keeps SNS messages and responses small
+    if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        json_options = {'separators': (',', ':'), 'ensure_ascii': False}
+    else:
+        json_options = {'indent': 2}
 
     return json.dumps({
         'timestamp': datetime.now().isoformat(),
-        'total_symbols_analyzed': len(set(r['symbol'] for r in results)),
+        'total_symbols_analyzed': len(set(r.symbol for r in results)),
         'local_extreme_highs': extreme_highs,
         'local_close_highs': close_highs,
         'local_extreme_lows': extreme_lows,
@@ -311,14 +880,39 @@ def format_results_json(results: List[Dict[str, Any]]) -> str:
             'close_lows_count': len(close_lows),
             'total_patterns': len(results)
         }
-    }, indent=2)
+    }, **json_options)
+
+
+def _get_sns():
+    """Return the shared SNS client, creating it on first use."""
+    global _sns_client
+    if _sns_client is None:
+        _sns_client = boto3.client('sns')
+    return _sns_client
+
+
+def publish_to_sns(results: List[Pattern], topic_arn: str,
+                   message: Optional[str] = None) -> bool:
+    """
+    Publish results to SNS topic.
 
+    Args:
+        results: Pattern results from analyze_stocks
+        topic_arn: SNS topic to publish to
+        message: Pre-serialized results; formatted from results if omitted
+
+    Returns:
+        True if published or there was nothing to publish
+    """
+    # Quiet days produce no patterns; skip the SNS round-trip entirely
+    if not results:
+        print("📊 No patterns detected; skipping SNS publish")
+        return True
 
-def publish_to_sns(results: List[Dict[str, Any]], topic_arn: str) -> bool:
-    """Publish results to SNS topic."""
     try:
-        sns = boto3.client('sns')
-        message = format_results_json(results)
+        sns = _get_sns()
+        if message is None:
+            message = format_results_json(results)
 
         response = sns.publish(
             TopicArn=topic_arn,
@@ -337,63 +931,41 @@ def publish_to_sns(results: List[Dict[str, Any]], topic_arn: str) -> bool:
         return False
 
 
-def analyze_stocks(symbols: List[str]) -> List[Dict[str, Any]]:
+def analyze_stocks(symbols: List[str]) -> List[Pattern]:
     """Analyze a list of stock symbols for local highs and lows."""
-    results = []
     total_symbols = len(symbols)
 
     print(f"🔍 Analyzing {total_symbols} stock symbols...")
 
+    # Fetch every symbol up front, concurrently
+    stock_data = get_stock_data_batch(symbols)
+
+    # Detect patterns for all symbols in one vectorized pass
+    results = analyze_patterns_batch(
+        {symbol: stock_data[symbol] for symbol in symbols
+         if symbol in stock_data}
+    )
+
+    markers: Dict[str, List[str]] = {}
+    for result in results:
+        markers.setdefault(result.symbol, []).append(
+            PATTERN_MARKERS[result.type]
+        )
+
+    # Buffer progress lines and write them in blocks, not per symbol
+    lines = []
     for i, symbol in enumerate(symbols, 1):
-        print(f"  [{i}/{total_symbols}] Processing {symbol}...", end=" ")
-
-        # Fetch stock data
-        data = get_stock_data(symbol)
-        if data is None:
-            continue
-
-        has_pattern = False
-
-        # Check for local extreme high
-        extreme_high_result = analyze_local_extreme_highs(data)
-        if extreme_high_result:
-            extreme_high_result['symbol'] = symbol
-            results.append(extreme_high_result)
-            print("📈E", end=" ")
-            has_pattern = True
-
-        # Check for local close high
-        close_high_result = analyze_local_close_highs(data)
-        if close_high_result:
-            close_high_result['symbol'] = symbol
-            results.append(close_high_result)
-            print("📈C", end=" ")
-            has_pattern = True
-
-        # Check for local extreme low
-        extreme_low_result = analyze_local_extreme_lows(data)
-        if extreme_low_result:
-            extreme_low_result['symbol'] = symbol
-            results.append(extreme_low_result)
-            print("📉E", end=" ")
-            has_pattern = True
-
-        # Check for local close low
-        close_low_result = analyze_local_close_lows(data)
-        if close_low_result:
-            close_low_result['symbol'] = symbol
-            results.append(close_low_result)
-            print("📉C", end=" ")
-            has_pattern = True
-
-        if not has_pattern:
-            print("➖", end=" ")
-
-        print("✓")
-
-        # Add delay between requests
-        if i < total_symbols:
-            add_request_delay(0.5)
+        if symbol in stock_data:
+            status = " ".join(markers.get(symbol, ["➖"]) + ["✓"])
+        else:
+            status = "❌ Skipped"
+        lines.append(f"  [{i}/{total_symbols}] Processing {symbol}... "
+                     f"{status}\n")
+
+        if len(lines) == PROGRESS_FLUSH_EVERY or i == total_symbols:
+            sys.stdout.write("".join(lines))
+            sys.stdout.flush()
+            lines = []
 
     return results
 
@@ -413,15 +985,18 @@ def lambda_handler(event, context):
         # Analyze stocks
         results = analyze_stocks(symbols)
 
+        # Serialize once for both SNS and the response body
+        body = format_results_json(results)
+
         # Publish to SNS if topic ARN provided
         sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
         if sns_topic_arn:
-            publish_to_sns(results, sns_topic_arn)
+            publish_to_sns(results, sns_topic_arn, body)
 
         # Return results
         return {
             'statusCode': 200,
-            'body': format_results_json(results)
+            'body': body
         }
 
     except Exception as e:
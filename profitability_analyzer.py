@@ -1,17 +1,51 @@
-import time
+import io
+import os
 import csv
+import re
 import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import yfinance as yf
 import pandas as pd
 from curl_cffi import requests
 import numpy as np
-from dataclasses import dataclass
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from itertools import repeat
+from operator import attrgetter, itemgetter
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the simulation runs as plain Python
+    njit = None
 
-@dataclass
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is used without it
+    orjson = None
+
+# The only columns the strategy reads
+PRICE_COLUMNS = ['High', 'Low', 'Close']
+
+# Symbols per yf.download call, to stay under Yahoo's URL length limits
+DOWNLOAD_BATCH_SIZE = 200
+
+# Per-symbol price histories are cached here between runs; only the days
+# missing since the last run are downloaded
+HISTORY_CACHE_DIR = os.environ.get('HISTORY_CACHE_DIR', 'cache')
+
+# Only symbols like these are cached; anything else (e.g. containing '/')
+# could escape HISTORY_CACHE_DIR when used in a file name
+_CACHEABLE_SYMBOL = re.compile(r'[A-Za-z0-9.^=-]{1,20}')
+
+# Chrome-impersonating session reused across downloads for keep-alive
+_session = None
+
+
+@dataclass(slots=True, frozen=True)
 class BacktestResult:
     """Results from backtesting a single stock."""
     symbol: str
@@ -26,9 +60,12 @@ class BacktestResult:
     analysis_days: int
 
 
-def add_request_delay(delay_seconds: float = 1.0) -> None:
-    """Add delay between requests to avoid rate limiting."""
-    time.sleep(delay_seconds)
+def _get_session() -> requests.Session:
+    """Return the shared curl_cffi session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = requests.Session(impersonate="chrome110")
+    return _session
 
 
 def get_historical_stock_data(symbol: str, days: int = 252) -> Optional[pd.DataFrame]:
@@ -42,39 +79,184 @@ def get_historical_stock_data(symbol: str, days: int = 252) -> Optional[pd.DataF
     Returns:
         DataFrame with historical stock data or None if failed
     """
+    return get_historical_stock_data_batch([symbol], days).get(symbol)
+
+
+def _validate_history(symbol: str, data: pd.DataFrame,
+                      days: int) -> Optional[pd.DataFrame]:
+    """Return data if it covers enough of the requested period, else None."""
+    if data.empty:
+        print(f"❌ No historical data available for {symbol}")
+        return None
+
+    # Dynamic minimum based on requested period
+    min_required = max(10, int(days * 0.4))  # At least 40% of requested days
+    if len(data) < min_required:
+        print(f"⚠️ Insufficient historical data for {symbol}: "
+              f"only {len(data)} days (need {min_required})")
+        return None
+
+    return data
+
+
+def _history_cache_file(symbol: str) -> str:
+    """File path of a symbol's cached price history."""
+    return os.path.join(HISTORY_CACHE_DIR, f"{symbol}.json")
+
+
+def _load_cached_history(symbol: str,
+                         start_date: datetime) -> Optional[pd.DataFrame]:
+    """Return a symbol's cached history if it goes back to start_date."""
+    path = _history_cache_file(symbol)
+    if not _CACHEABLE_SYMBOL.fullmatch(symbol) or not os.path.exists(path):
+        return None
+
     try:
-        # Use curl_cffi session to simulate Chrome browser
-        session = requests.Session(impersonate="chrome110")
-        
-        # Create yfinance ticker with custom session
-        ticker = yf.Ticker(symbol)
-        ticker.session = session
-        
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days + 10)
-        
-        # Fetch historical data
-        data = ticker.history(start=start_date, end=end_date)
-        
-        if data.empty:
-            print(f"❌ No historical data available for {symbol}")
-            return None
-            
-        # Dynamic minimum based on requested period
-        min_required = max(10, int(days * 0.4))  # At least 40% of requested days
-        if len(data) < min_required:
-            print(f"⚠️ Insufficient historical data for {symbol}: "
-                  f"only {len(data)} days (need {min_required})")
+        with open(path) as f:
+            cached = json.load(f)
+        if datetime.fromisoformat(cached['start']) > start_date:
             return None
-            
-        return data
-        
+        index = np.array(cached['index'], dtype=cached['index_dtype'])
+        return pd.DataFrame(cached['columns'],
+                            index=pd.DatetimeIndex(index),
+                            columns=PRICE_COLUMNS)
     except Exception as e:
-        print(f"❌ Error fetching historical data for {symbol}: {str(e)}")
+        print(f"⚠️ Ignoring unreadable cache for {symbol}: {str(e)}")
         return None
 
 
+def _save_cached_history(symbol: str, data: pd.DataFrame,
+                         start_date: datetime) -> None:
+    """Cache a symbol's history along with the first date it covers."""
+    if not _CACHEABLE_SYMBOL.fullmatch(symbol):
+        return
+
+    try:
+        os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+        with open(_history_cache_file(symbol), 'w') as f:
+            json.dump({
+                'start': start_date.isoformat(),
+                'index': data.index.asi8.tolist(),
+                'index_dtype': str(data.index.dtype),
+                'columns': {column: data[column].tolist()
+                            for column in PRICE_COLUMNS}
+            }, f)
+    except Exception as e:
+        print(f"⚠️ Error caching history for {symbol}: {str(e)}")
+
+
+def _download_histories(symbols: List[str], start_date: datetime,
+                        end_date: datetime,
+                        session: requests.Session) -> Dict[str, pd.DataFrame]:
+    """Download daily bars for symbols, DOWNLOAD_BATCH_SIZE at a time."""
+    histories = {}
+    for start in range(0, len(symbols), DOWNLOAD_BATCH_SIZE):
+        batch = symbols[start:start + DOWNLOAD_BATCH_SIZE]
+        try:
+            raw = yf.download(batch, start=start_date, end=end_date,
+                              group_by='ticker', auto_adjust=True,
+                              threads=True, progress=False, session=session)
+        except Exception as e:
+            print(f"❌ Error downloading historical data: {str(e)}")
+            continue
+
+        if raw is None or raw.empty:
+            continue
+
+        # Older yfinance versions return flat columns for a single ticker
+        multi_level = isinstance(raw.columns, pd.MultiIndex)
+        downloaded = (set(raw.columns.get_level_values(0)) if multi_level
+                      else set(batch))
+        for symbol in batch:
+            if symbol in downloaded:
+                data = (raw[symbol] if multi_level else raw)[PRICE_COLUMNS]
+                data = data.dropna()
+                if not data.empty:
+                    histories[symbol] = data
+
+    return histories
+
+
+def get_historical_stock_data_batch(
+    symbols: List[str], days: int = 252
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch historical stock data for many symbols with batched downloads.
+
+    Completed bars are cached in HISTORY_CACHE_DIR. Cached symbols only
+    download from their last cached day onwards; if that day's prices no
+    longer match (e.g. Yahoo re-adjusted the history after a split or
+    dividend) the whole history is downloaded again. Everything else is
+    downloaded DOWNLOAD_BATCH_SIZE symbols at a time with yf.download, which
+    fetches each batch concurrently.
+
+    Args:
+        symbols: Stock symbols to fetch
+        days: Number of days of historical data (default 252 = ~1 year)
+
+    Returns:
+        Dict mapping symbol to its historical data; failed symbols are omitted
+    """
+    session = _get_session()
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days + 10)
+    today = pd.Timestamp(end_date.date())
+
+    # Split symbols into cached and uncached histories
+    cached = {}
+    missing = []
+    for symbol in symbols:
+        data = _load_cached_history(symbol, start_date)
+        if data is None or data.empty:
+            missing.append(symbol)
+        else:
+            cached[symbol] = data
+
+    # Re-fetch from each cached history's last day, which also picks up
+    # today's bar and lets us check the cached prices still match
+    histories = {}
+    if cached:
+        tail_start = min(data.index.max() for data in cached.values())
+        tails = _download_histories(list(cached), tail_start, end_date,
+                                    session)
+        for symbol, data in cached.items():
+            tail = tails.get(symbol)
+            if tail is None:
+                histories[symbol] = data  # Keep what we have
+                continue
+
+            overlap = data.index.intersection(tail.index)
+            if (overlap.empty
+                    or not np.allclose(data.loc[overlap].to_numpy(),
+                                       tail.loc[overlap].to_numpy(),
+                                       rtol=1e-5)):
+                missing.append(symbol)  # Re-adjusted; download it all
+                continue
+
+            data = pd.concat([data, tail])
+            histories[symbol] = data[~data.index.duplicated(keep='last')]
+
+    histories.update(_download_histories(missing, start_date, end_date,
+                                         session))
+
+    # Only cache completed bars; today's bar may still be in progress
+    for symbol, data in histories.items():
+        _save_cached_history(symbol, data[data.index < today], start_date)
+
+    # Trim to the requested period and drop symbols without enough data
+    results = {}
+    for symbol in symbols:
+        if symbol not in histories:
+            print(f"❌ No historical data available for {symbol}")
+            continue
+        data = histories[symbol]
+        data = _validate_history(symbol, data[data.index >= start_date], days)
+        if data is not None:
+            results[symbol] = data
+
+    return results
+
+
 def has_extreme_price_movement(data: pd.DataFrame, index: int, 
                                threshold: float = 0.25) -> bool:
     """
@@ -91,8 +273,9 @@ def has_extreme_price_movement(data: pd.DataFrame, index: int,
     if index < 1 or index >= len(data):
         return False
     
-    current_close = data.iloc[index]['Close']
-    previous_close = data.iloc[index - 1]['Close']
+    closes = data['Close'].to_numpy()
+    current_close = closes[index]
+    previous_close = closes[index - 1]
     
     # Calculate daily price change percentage
     price_change_pct = abs(current_close - previous_close) / previous_close
@@ -115,33 +298,27 @@ def filter_extreme_events(data: pd.DataFrame,
     if len(data) < 5:  # Need minimum data for filtering
         return data
     
-    # Identify extreme movement days
-    extreme_days = []
-    for i in range(1, len(data)):
-        if has_extreme_price_movement(data, i, threshold):
-            extreme_days.append(i)
+    # Flag extreme movement days from day-over-day close changes
+    close = data['Close'].to_numpy(dtype=np.float64)
+    extreme = np.zeros(len(close), dtype=bool)
+    extreme[1:] = np.abs(np.diff(close)) / close[:-1] >= threshold
     
-    if not extreme_days:
+    if not extreme.any():
         return data  # No extreme events found
     
-    # Create mask to exclude extreme days and buffer days around them
-    exclude_indices = set()
+    # Mask each extreme day and the buffer days around it
     buffer_days = 2  # Exclude 2 days before and after extreme events
-    
-    for extreme_day in extreme_days:
-        for offset in range(-buffer_days, buffer_days + 1):
-            exclude_idx = extreme_day + offset
-            if 0 <= exclude_idx < len(data):
-                exclude_indices.add(exclude_idx)
+    exclude = np.zeros(len(data), dtype=bool)
+    for day in np.flatnonzero(extreme):
+        exclude[max(0, day - buffer_days):day + buffer_days + 1] = True
     
     # Filter out extreme events and surrounding days
-    filtered_data = data.iloc[[i for i in range(len(data)) 
-                               if i not in exclude_indices]]
+    filtered_data = data.iloc[~exclude]
     
-    print(f"   📊 Filtered out {len(exclude_indices)} days with extreme "
+    print(f"   📊 Filtered out {int(exclude.sum())} days with extreme "
           f"events (>{threshold*100:.0f}% moves)")
     
-    return filtered_data.reset_index(drop=True) if not filtered_data.empty else data
+    return filtered_data if not filtered_data.empty else data
 
 
 def detect_local_extreme_high_historical(data: pd.DataFrame, 
@@ -159,9 +336,10 @@ def detect_local_extreme_high_historical(data: pd.DataFrame,
     if index < 1 or index >= len(data) - 1:
         return False
     
-    yesterday_high = data.iloc[index]['High']
-    today_high = data.iloc[index + 1]['High']
-    two_days_ago_high = data.iloc[index - 1]['High']
+    highs = data['High'].to_numpy()
+    yesterday_high = highs[index]
+    today_high = highs[index + 1]
+    two_days_ago_high = highs[index - 1]
     
     return yesterday_high > max(today_high, two_days_ago_high)
 
@@ -181,9 +359,10 @@ def detect_local_extreme_low_historical(data: pd.DataFrame,
     if index < 1 or index >= len(data) - 1:
         return False
     
-    yesterday_low = data.iloc[index]['Low']
-    today_low = data.iloc[index + 1]['Low']
-    two_days_ago_low = data.iloc[index - 1]['Low']
+    lows = data['Low'].to_numpy()
+    yesterday_low = lows[index]
+    today_low = lows[index + 1]
+    two_days_ago_low = lows[index - 1]
     
     return yesterday_low < min(today_low, two_days_ago_low)
 
@@ -203,9 +382,10 @@ def detect_local_close_high_historical(data: pd.DataFrame,
     if index < 1 or index >= len(data) - 1:
         return False
     
-    yesterday_close = data.iloc[index]['Close']
-    today_close = data.iloc[index + 1]['Close']
-    two_days_ago_close = data.iloc[index - 1]['Close']
+    closes = data['Close'].to_numpy()
+    yesterday_close = closes[index]
+    today_close = closes[index + 1]
+    two_days_ago_close = closes[index - 1]
     
     return yesterday_close > max(today_close, two_days_ago_close)
 
@@ -225,13 +405,81 @@ def detect_local_close_low_historical(data: pd.DataFrame,
     if index < 1 or index >= len(data) - 1:
         return False
     
-    yesterday_close = data.iloc[index]['Close']
-    today_close = data.iloc[index + 1]['Close']
-    two_days_ago_close = data.iloc[index - 1]['Close']
+    closes = data['Close'].to_numpy()
+    yesterday_close = closes[index]
+    today_close = closes[index + 1]
+    two_days_ago_close = closes[index - 1]
     
     return yesterday_close < min(today_close, two_days_ago_close)
 
 
+def _simulate(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+              max_hold_days: int):
+    """
+    Walk the bars of one stock, entering long on a local extreme or close
+    low and exiting on a local extreme or close high or after
+    max_hold_days. Signals are evaluated inline as each bar is visited.
+
+    Returns:
+        Tuple of (entry_idx, exit_idx, returns, trade_count); the arrays
+        are valid up to trade_count
+    """
+    n = closes.size
+    entry_idx = np.empty(n, np.int64)
+    exit_idx = np.empty(n, np.int64)
+    returns = np.empty(n, np.float64)
+
+    k = 0
+    in_position = False
+    entry_price = 0.0
+    entry_day = 0
+    days_held = 0
+
+    for i in range(1, n - 1):
+        price = closes[i + 1]
+
+        # Exit position if held too long
+        if in_position and days_held >= max_hold_days:
+            return_pct = (price - entry_price) / entry_price
+            entry_idx[k] = entry_day
+            exit_idx[k] = i + 1
+            returns[k] = return_pct
+            k += 1
+            in_position = False
+            days_held = 0
+
+        if not in_position:
+            # Enter long position (buy) on a local extreme or close low
+            if ((lows[i] < lows[i + 1] and lows[i] < lows[i - 1])
+                    or (closes[i] < closes[i + 1]
+                        and closes[i] < closes[i - 1])):
+                in_position = True
+                entry_price = price
+                entry_day = i + 1
+                days_held = 0
+        else:
+            days_held += 1
+
+            # Exit long position (sell) on a local extreme or close high
+            if ((highs[i] > highs[i + 1] and highs[i] > highs[i - 1])
+                    or (closes[i] > closes[i + 1]
+                        and closes[i] > closes[i - 1])):
+                return_pct = (price - entry_price) / entry_price
+                entry_idx[k] = entry_day
+                exit_idx[k] = i + 1
+                returns[k] = return_pct
+                k += 1
+                in_position = False
+                days_held = 0
+
+    return entry_idx, exit_idx, returns, k
+
+
+if njit is not None:
+    # Compiled on first use; cache=True keeps the machine code on disk
+    _simulate = njit(cache=True)(_simulate)
+
+
 def simulate_trading_strategy(data: pd.DataFrame, symbol: str, 
                               filter_extremes: bool = True, 
                               extreme_threshold: float = 0.25,
@@ -285,78 +533,17 @@ def simulate_trading_strategy(data: pd.DataFrame, symbol: str,
             analysis_days=len(data)
         )
     
-    trades = []
-    position = None  # None, 'long', or 'short'
-    position_entry_price = 0
-    position_entry_date = None
-    position_days_held = 0
     max_hold_days = 10
-    
-    # Track portfolio value over time for drawdown calculation
-    portfolio_values = []
     initial_capital = 10000
-    current_capital = initial_capital
-    
-    for i in range(1, len(data) - 1):
-        current_price = data.iloc[i + 1]['Close']
-        current_date = data.index[i + 1]
-        
-        # Check for signals
-        extreme_high = detect_local_extreme_high_historical(data, i)
-        extreme_low = detect_local_extreme_low_historical(data, i)
-        close_high = detect_local_close_high_historical(data, i)
-        close_low = detect_local_close_low_historical(data, i)
-        
-        # Exit position if held too long
-        if position and position_days_held >= max_hold_days:
-            if position == 'long':
-                return_pct = (current_price - position_entry_price) / position_entry_price
-                current_capital *= (1 + return_pct)
-                trades.append({
-                    'entry_date': position_entry_date,
-                    'exit_date': current_date,
-                    'entry_price': position_entry_price,
-                    'exit_price': current_price,
-                    'position': position,
-                    'return_pct': return_pct,
-                    'reason': 'max_hold_exceeded'
-                })
-            position = None
-            position_days_held = 0
-        
-        # Trading logic
-        if position is None:
-            # Look for entry signals
-            if extreme_low or close_low:
-                # Enter long position (buy)
-                position = 'long'
-                position_entry_price = current_price
-                position_entry_date = current_date
-                position_days_held = 0
-        else:
-            position_days_held += 1
-            
-            # Look for exit signals
-            if position == 'long' and (extreme_high or close_high):
-                # Exit long position (sell)
-                return_pct = (current_price - position_entry_price) / position_entry_price
-                current_capital *= (1 + return_pct)
-                trades.append({
-                    'entry_date': position_entry_date,
-                    'exit_date': current_date,
-                    'entry_price': position_entry_price,
-                    'exit_price': current_price,
-                    'position': position,
-                    'return_pct': return_pct,
-                    'reason': 'signal_exit'
-                })
-                position = None
-                position_days_held = 0
-        
-        portfolio_values.append(current_capital)
     
+    # Detect signals and trade in a single pass over the bars
+    _, _, returns, trade_count = _simulate(
+        data['High'].to_numpy(), data['Low'].to_numpy(),
+        data['Close'].to_numpy(), max_hold_days
+    )
+
     # Calculate performance metrics
-    if not trades:
+    if trade_count == 0:
         return BacktestResult(
             symbol=symbol,
             total_return=0.0,
@@ -370,34 +557,29 @@ def simulate_trading_strategy(data: pd.DataFrame, symbol: str,
             analysis_days=len(data)
         )
     
-    total_return = (current_capital - initial_capital) / initial_capital
-    profitable_trades = sum(1 for trade in trades if trade['return_pct'] > 0)
-    win_rate = profitable_trades / len(trades) if trades else 0
-    avg_return_per_trade = float(np.mean([trade['return_pct'] for trade in trades]))
+    returns = returns[:trade_count]
+
+    # Capital only changes when a trade closes, so track it per trade
+    equity = initial_capital * np.concatenate(([1.0],
+                                               np.cumprod(1 + returns)))
+    total_return = float((equity[-1] - initial_capital) / initial_capital)
+    profitable_trades = int((returns > 0).sum())
+    win_rate = profitable_trades / trade_count
+    avg_return_per_trade = float(returns.mean())
     
-    # Calculate max drawdown
-    peak = initial_capital
-    max_drawdown = 0
-    for value in portfolio_values:
-        if value > peak:
-            peak = value
-        drawdown = (peak - value) / peak
-        max_drawdown = max(max_drawdown, drawdown)
+    # Calculate max drawdown over the equity curve
+    peaks = np.maximum.accumulate(equity)
+    max_drawdown = float(((peaks - equity) / peaks).max())
     
     # Calculate Sharpe ratio (simplified)
-    returns = [trade['return_pct'] for trade in trades]
-    if returns:
-        volatility = float(np.std(returns))
-        sharpe_ratio = avg_return_per_trade / volatility if volatility > 0 else 0
-    else:
-        volatility = 0
-        sharpe_ratio = 0
+    volatility = float(returns.std())
+    sharpe_ratio = avg_return_per_trade / volatility if volatility > 0 else 0
     
     return BacktestResult(
         symbol=symbol,
         total_return=total_return,
         win_rate=win_rate,
-        total_trades=len(trades),
+        total_trades=trade_count,
         profitable_trades=profitable_trades,
         avg_return_per_trade=avg_return_per_trade,
         max_drawdown=max_drawdown,
@@ -407,36 +589,65 @@ def simulate_trading_strategy(data: pd.DataFrame, symbol: str,
     )
 
 
-def read_candidate_stocks_csv(file_path: str = 'candidate_stocks.csv') -> List[str]:
+def _backtest(data: pd.DataFrame, symbol: str, filter_extremes: bool,
+              extreme_threshold: float,
+              requested_days: int) -> Tuple[BacktestResult, str]:
+    """
+    Run simulate_trading_strategy in a pool worker.
+
+    The notes it prints are captured and returned with the result, so
+    main can print them under the symbol's progress line.
+
+    Returns:
+        Tuple of (BacktestResult, captured output)
+    """
+    notes = io.StringIO()
+    with redirect_stdout(notes):
+        result = simulate_trading_strategy(data, symbol, filter_extremes,
+                                           extreme_threshold, requested_days)
+    return result, notes.getvalue()
+
+
+@lru_cache(maxsize=32)
+def _read_symbols(file_path: str, mtime: float,
+                  max_length: Optional[int] = None,
+                  exclude_names: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Read symbols from a CSV file in one vectorized pass.
+
+    Symbols come from the 'Stock Symbol' column (CBOE format), else 'symbol',
+    else the first column; blank and '#' comment entries are skipped.
+    Results are cached until the file's mtime changes.
+
+    Args:
+        file_path: CSV file to read
+        mtime: Modification time of file_path, used as the cache key
+        max_length: Drop symbols longer than this, if given
+        exclude_names: Pattern; drop rows whose 'Company Name' matches it
+
+    Returns:
+        Upper-cased symbols in file order
+    """
+    df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+    column = next((c for c in ('Stock Symbol', 'symbol') if c in df.columns),
+                  df.columns[0])
+    symbol = df[column].str.strip().str.upper()
+
+    keep = (symbol != '') & ~symbol.str.startswith('#')  # Skip comments
+    if max_length is not None:
+        keep &= symbol.str.len() <= max_length
+    if exclude_names is not None:
+        keep &= ~df['Company Name'].str.upper().str.contains(exclude_names,
+                                                             regex=True)
+    return tuple(symbol[keep])
+
+
+def read_candidate_stocks_csv(
+    file_path: str = 'candidate_stocks.csv'
+) -> List[str]:
     """Read candidate stock symbols from CSV file."""
-    symbols = []
     try:
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            # Handle different CSV formats
-            if 'Stock Symbol' in reader.fieldnames:
-                # CBOE format: "Stock Symbol,Company Name"
-                for row in reader:
-                    symbol = row['Stock Symbol'].strip().upper()
-                    if symbol and not symbol.startswith('#'):  # Skip comments
-                        symbols.append(symbol)
-            elif 'symbol' in reader.fieldnames:
-                # Standard format: "symbol,name"
-                for row in reader:
-                    symbol = row['symbol'].strip().upper()
-                    if symbol and not symbol.startswith('#'):  # Skip comments
-                        symbols.append(symbol)
-            else:
-                # Try first column
-                first_col = reader.fieldnames[0] if reader.fieldnames else None
-                if first_col:
-                    for row in reader:
-                        symbol = row[first_col].strip().upper()
-                        if symbol and not symbol.startswith('#'):
-                            symbols.append(symbol)
-        
-        return symbols
+        return list(_read_symbols(file_path, os.path.getmtime(file_path)))
     except FileNotFoundError:
         print(f"❌ Candidate stocks file not found: {file_path}")
         print("Creating example file...")
@@ -449,21 +660,12 @@ def read_candidate_stocks_csv(file_path: str = 'candidate_stocks.csv') -> List[s
 
 def read_cboe_symbols_csv(file_path: str = 'cboesymboldirweeklys.csv') -> List[str]:
     """Read CBOE weekly options symbols from CSV file."""
-    symbols = []
     try:
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if 'Stock Symbol' in row:
-                    symbol = row['Stock Symbol'].strip().upper()
-                    # Filter out ETFs and complex instruments for basic analysis
-                    if (symbol and 
-                        not symbol.startswith('#') and 
-                        len(symbol) <= 5 and  # Basic stock symbols
-                        not any(x in row['Company Name'].upper() for x in 
-                               ['ETF', 'FUTURES', 'VIX', 'BITCOIN', 'ETHER'])):
-                        symbols.append(symbol)
-        
+        # Filter out ETFs and complex instruments for basic analysis
+        symbols = list(_read_symbols(
+            file_path, os.path.getmtime(file_path), max_length=5,
+            exclude_names='ETF|FUTURES|VIX|BITCOIN|ETHER'
+        ))
         print(f"📊 Loaded {len(symbols)} filtered stock symbols from CBOE file")
         return symbols
     except FileNotFoundError:
@@ -511,7 +713,7 @@ def format_profitability_results(results: List[BacktestResult]) -> None:
         return
     
     # Sort by total return (descending)
-    results.sort(key=lambda x: x.total_return, reverse=True)
+    results.sort(key=attrgetter('total_return'), reverse=True)
     
     print("\n" + "=" * 100)
     print("📊 STOCK PROFITABILITY ANALYSIS RESULTS")
@@ -537,13 +739,13 @@ def format_profitability_results(results: List[BacktestResult]) -> None:
               f"({results[-1].total_return:+.1%} return)")
     
     # Show statistics
-    positive_returns = [r for r in results if r.total_return > 0]
+    returns = np.fromiter((r.total_return for r in results),
+                          dtype=np.float64, count=len(results))
+    profitable = int((returns > 0).sum())
     print(f"\n📊 Summary Statistics:")
-    print(f"   • Profitable stocks: {len(positive_returns)}/{len(results)} "
-          f"({len(positive_returns)/len(results)*100:.1f}%)")
-    if results:
-        avg_return = sum(r.total_return for r in results) / len(results)
-        print(f"   • Average return: {avg_return:+.1%}")
+    print(f"   • Profitable stocks: {profitable}/{len(results)} "
+          f"({profitable/len(results)*100:.1f}%)")
+    print(f"   • Average return: {returns.mean():+.1%}")
 
 
 def save_results_to_json(results: List[BacktestResult]) -> None:
@@ -551,32 +753,22 @@ def save_results_to_json(results: List[BacktestResult]) -> None:
     if not results:
         return
     
-    # Convert results to dictionary format
-    results_dict = []
-    for result in results:
-        results_dict.append({
-            'symbol': result.symbol,
-            'total_return': result.total_return,
-            'win_rate': result.win_rate,
-            'total_trades': result.total_trades,
-            'profitable_trades': result.profitable_trades,
-            'avg_return_per_trade': result.avg_return_per_trade,
-            'max_drawdown': result.max_drawdown,
-            'sharpe_ratio': result.sharpe_ratio,
-            'volatility': result.volatility,
-            'analysis_days': result.analysis_days
-        })
-    
-    # Sort by total return
-    results_dict.sort(key=lambda x: x['total_return'], reverse=True)
+    # Convert results to dictionary format, sorted by total return
+    results_dict = sorted((asdict(result) for result in results),
+                          key=itemgetter('total_return'), reverse=True)
     
     # Save to file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"profitability_results_{timestamp}.json"
     
     try:
-        with open(filename, 'w') as f:
-            json.dump(results_dict, f, indent=2)
+        if orjson is not None:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(results_dict, option=orjson.OPT_INDENT_2
+                                     | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(results_dict, f, indent=2)
         print(f"💾 Results saved to: {filename}")
     except Exception as e:
         print(f"❌ Error saving results: {str(e)}")
@@ -632,33 +824,38 @@ def main(filter_extremes: bool = True, extreme_threshold: float = 0.25,
         print(f"🔬 Limited to first {max_symbols} symbols for testing")
     
     print(f"🔍 Analyzing {len(candidate_stocks)} candidate stocks...")
-    print("⏱️ This may take a while due to rate limiting...")
-    
+    print("📥 Downloading historical data in batches...")
+
+    # Fetch all histories up front with batched downloads
+    histories = get_historical_stock_data_batch(candidate_stocks,
+                                                days=lookback_days)
+    
+    # Backtests are independent and CPU-bound, so run them on every core
+    symbols = [symbol for symbol in candidate_stocks if symbol in histories]
+    with ProcessPoolExecutor() as executor:
+        backtests = dict(zip(symbols, executor.map(
+            _backtest,
+            [histories[symbol] for symbol in symbols], symbols,
+            repeat(filter_extremes), repeat(extreme_threshold),
+            repeat(lookback_days)
+        )))
+
     results = []
     
     for i, symbol in enumerate(candidate_stocks, 1):
         print(f"\n[{i}/{len(candidate_stocks)}] Analyzing {symbol}...", 
               end=" ")
         
-        # Fetch historical data with custom lookback period
-        historical_data = get_historical_stock_data(symbol, days=lookback_days)
-        if historical_data is None:
+        if symbol not in backtests:
             print("❌ Skipped")
             continue
-        
-        # Run backtest with extreme filtering
-        result = simulate_trading_strategy(historical_data, symbol, 
-                                           filter_extremes, extreme_threshold,
-                                           lookback_days)
+        result, notes = backtests[symbol]
         results.append(result)
         
+        print(notes, end="")
         print(f"✅ Return: {result.total_return:+.1%}, "
               f"Win Rate: {result.win_rate:.1%}, "
               f"Trades: {result.total_trades}")
-        
-        # Add delay between requests
-        if i < len(candidate_stocks):
-            add_request_delay(1.0)
     
     # Display results
     format_profitability_results(results)
@@ -0,0 +1,16 @@
+"""Session-scoped pytest fixtures mirroring the unittest class fixtures."""
+import os
+import sys
+
+import pytest
+
+# Make the shared sample data importable under any pytest import mode
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sample_data import SAMPLE_DATA  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def sample_data():
+    """The shared 3-day sample DataFrame (same object as in TestCase)."""
+    return SAMPLE_DATA
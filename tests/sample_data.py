@@ -0,0 +1,24 @@
+"""Sample stock data shared by the tests and conftest.py fixtures."""
+import numpy as np
+import pandas as pd
+
+# Fixture dates: 2 days ago, yesterday, today
+DATES = pd.DatetimeIndex(np.array(['2025-10-06', '2025-10-07', '2025-10-08'],
+                                  dtype='datetime64[ns]'))
+
+# Sample stock data for 3-day analysis
+SAMPLE_DATA = pd.DataFrame({
+    # Yesterday (155) > max(today 152, 2-days-ago 150)
+    'High': [150.0, 155.0, 152.0],
+    # Yesterday (140) < min(today 149, 2-days-ago 145)
+    'Low': [145.0, 140.0, 149.0],
+    'Close': [148.0, 153.0, 151.0],
+    'Open': [147.0, 151.0, 150.0],
+    'Volume': [1000000, 1200000, 1100000]
+}, index=DATES)
+
+# Fixture variants with one pattern removed
+# Yesterday high too low
+NO_EXTREME_HIGH = SAMPLE_DATA.assign(High=[150.0, 145.0, 152.0])
+# Yesterday close too high
+NO_CLOSE_LOW = SAMPLE_DATA.assign(Close=[148.0, 160.0, 151.0])
@@ -1,132 +1,401 @@
 import unittest
 import sys
 import os
-from unittest.mock import patch, MagicMock
+import json
+import tempfile
+from functools import lru_cache
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
 import pandas as pd
 
-# Add parent directory to path to import app
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# Import app functions after path modification  # noqa: E402
-from app import (analyze_local_extreme_highs, analyze_local_close_highs,
-                 analyze_local_extreme_lows, analyze_local_close_lows,
-                 get_stock_data)
+# Add parent directory to path to import app, and this directory for the
+# shared sample data
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(TESTS_DIR), TESTS_DIR]
+
+from sample_data import (  # noqa: E402
+    SAMPLE_DATA, NO_EXTREME_HIGH, NO_CLOSE_LOW
+)
+
+
+@lru_cache(maxsize=None)
+def _load():
+    """Import app on first use; it pulls in curl_cffi, boto3 and numba."""
+    import app
+    return app
+
+
+# Single-pattern analyzers, in PATTERN_MARKERS order
+_ANALYZERS = ('analyze_local_extreme_highs', 'analyze_local_close_highs',
+              'analyze_local_extreme_lows', 'analyze_local_close_lows')
+
+
+def _chart_payload(data):
+    """Build a Yahoo v8 chart response for data (None for no result)."""
+    if data is None:
+        return {'chart': {'result': None,
+                          'error': {'code': 'Not Found'}}}
+
+    # Daily bars are stamped at the 9:30 ET market open
+    index = data.index.tz_localize('America/New_York') + pd.Timedelta('9.5h')
+    return {'chart': {'result': [{
+        'meta': {'exchangeTimezoneName': 'America/New_York',
+                 'gmtoffset': -14400},
+        'timestamp': [int(ts.timestamp()) for ts in index],
+        'indicators': {'quote': [{
+            'high': data['High'].tolist(),
+            'low': data['Low'].tolist(),
+            'close': data['Close'].tolist()
+        }]}
+    }], 'error': None}}
+
+
+def _chart_response(data, status_code=200):
+    """Build a minimal HTTP response double carrying a chart payload."""
+    payload = _chart_payload(data)
+    return SimpleNamespace(status_code=status_code, json=lambda: payload)
+
+
+class FakeSession:
+    """Stand-in for a curl_cffi Session replaying canned responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, params=None):
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class FakeChartSession:
+    """Stand-in for curl_cffi's AsyncSession serving canned chart data."""
+
+    def __init__(self, stock_data):
+        self.stock_data = stock_data
+        self.requested = []
+
+    async def get(self, url, params=None):
+        symbol = url.rsplit('/', 1)[-1]
+        self.requested.append(symbol)
+        status_code = 200 if symbol in self.stock_data else 404
+        return _chart_response(self.stock_data.get(symbol), status_code)
 
 
 class TestStockAnalysis(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data shared by all tests (never mutated in place)."""
+        cls.app = _load()
+        cls.analyzers = tuple(getattr(cls.app, name) for name in _ANALYZERS)
+        cls.sample_data = SAMPLE_DATA
+        # Only 2 days, too few for any pattern
+        cls._insufficient = cls.sample_data.iloc[:2]
+
     def setUp(self):
-        """Set up test data."""
-        # Create sample stock data for 3-day analysis
-        dates = pd.date_range(start='2025-10-06', end='2025-10-08', freq='D')
-        self.sample_data = pd.DataFrame({
-            # Yesterday (155) > max(today 152, 2-days-ago 150)
-            'High': [150.0, 155.0, 152.0],
-            # Yesterday (140) < min(today 149, 2-days-ago 145)
-            'Low': [145.0, 140.0, 149.0],
-            'Close': [148.0, 153.0, 151.0],
-            'Open': [147.0, 151.0, 150.0],
-            'Volume': [1000000, 1200000, 1100000]
-        }, index=dates)
+        """Disable caching unless a test opts in, whatever the env says."""
+        patcher = patch.multiple('app', REDIS_URL=None, STOCK_CACHE_DIR=None,
+                                 _l1_cache=self.app.OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_analyze_local_extreme_highs_detected(self):
         """Test local extreme high detection when condition is met."""
-        result = analyze_local_extreme_highs(self.sample_data)
+        result = self.app.analyze_local_extreme_highs(self.sample_data)
 
         self.assertIsNotNone(result)
-        self.assertEqual(result['type'], 'local_extreme_high')
-        self.assertEqual(result['high_price'], 155.0)
-        self.assertEqual(result['close_price'], 153.0)
+        self.assertEqual(
+            (result['type'], result['high_price'], result['close_price']),
+            ('local_extreme_high', 155.0, 153.0)
+        )
 
     def test_analyze_local_extreme_highs_not_detected(self):
         """Test local extreme high detection when condition is not met."""
-        # Modify data so no local extreme high exists
-        modified_data = self.sample_data.copy()
-        # Yesterday high too low
-        modified_data.iloc[-2, modified_data.columns.get_loc('High')] = 145.0
-
-        result = analyze_local_extreme_highs(modified_data)
+        result = self.app.analyze_local_extreme_highs(NO_EXTREME_HIGH)
         self.assertIsNone(result)
 
     def test_analyze_local_close_highs_detected(self):
         """Test local close high detection when condition is met."""
-        result = analyze_local_close_highs(self.sample_data)
+        result = self.app.analyze_local_close_highs(self.sample_data)
 
         self.assertIsNotNone(result)
-        self.assertEqual(result['type'], 'local_close_high')
-        self.assertEqual(result['close_price'], 153.0)
+        self.assertEqual((result['type'], result['close_price']),
+                         ('local_close_high', 153.0))
 
     def test_analyze_local_extreme_lows_detected(self):
         """Test local extreme low detection when condition is met."""
-        result = analyze_local_extreme_lows(self.sample_data)
+        result = self.app.analyze_local_extreme_lows(self.sample_data)
 
         self.assertIsNotNone(result)
-        self.assertEqual(result['type'], 'local_extreme_low')
-        self.assertEqual(result['low_price'], 140.0)
-        self.assertEqual(result['close_price'], 153.0)
+        self.assertEqual(
+            (result['type'], result['low_price'], result['close_price']),
+            ('local_extreme_low', 140.0, 153.0)
+        )
 
     def test_analyze_local_close_lows_not_detected(self):
         """Test local close low detection when condition is not met."""
-        # Modify data so no local close low exists
-        modified_data = self.sample_data.copy()
-        # Yesterday close too high
-        modified_data.iloc[-2, modified_data.columns.get_loc('Close')] = 160.0
-
-        result = analyze_local_close_lows(modified_data)
+        result = self.app.analyze_local_close_lows(NO_CLOSE_LOW)
         self.assertIsNone(result)
 
     def test_insufficient_data(self):
         """Test behavior with insufficient data."""
-        insufficient_data = self.sample_data.head(2)  # Only 2 days
+        for analyzer in self.analyzers:
+            with self.subTest(analyzer=analyzer.__name__):
+                self.assertIsNone(analyzer(self._insufficient))
 
-        extreme_high_result = analyze_local_extreme_highs(insufficient_data)
-        close_high_result = analyze_local_close_highs(insufficient_data)
-        extreme_low_result = analyze_local_extreme_lows(insufficient_data)
-        close_low_result = analyze_local_close_lows(insufficient_data)
+    def test_analyze_patterns_batch_matches_single_analyzers(self):
+        """Test vectorized batch detection agrees with the analyzers."""
+        stock_data = {'AAPL': self.sample_data, 'MSFT': NO_EXTREME_HIGH}
 
-        self.assertIsNone(extreme_high_result)
-        self.assertIsNone(close_high_result)
-        self.assertIsNone(extreme_low_result)
-        self.assertIsNone(close_low_result)
+        results = self.app.analyze_patterns_batch(
+            {symbol: self.app.price_window(data)
+             for symbol, data in stock_data.items()}
+        )
 
-    @patch('app.yf.Ticker')
-    @patch('app.requests.Session')
-    def test_get_stock_data_success(self, mock_session, mock_ticker):
-        """Test successful stock data retrieval."""
-        # Mock the yfinance response
-        mock_ticker_instance = MagicMock()
-        mock_ticker.return_value = mock_ticker_instance
-        mock_ticker_instance.history.return_value = self.sample_data
+        expected = []
+        for symbol, data in stock_data.items():
+            for analyzer in self.analyzers:
+                result = analyzer(data)
+                if result:
+                    result['symbol'] = symbol
+                    expected.append(result)
+        self.assertEqual([self.app.pattern_to_dict(p) for p in results],
+                         expected)
+
+    def test_pattern_kernel_matches_numpy_fallback(self):
+        """Test the (optionally JIT-compiled) kernel agrees with NumPy."""
+        arr = np.random.default_rng(0).integers(1, 5, (200, 3, 3))
+        arr = arr.astype(float)
+
+        hits = self.app._pattern_hits(arr)
+        with patch('app.njit', None):
+            fallback_hits = self.app._pattern_hits(arr)
 
-        result = get_stock_data('AAPL')
+        np.testing.assert_array_equal(hits, fallback_hits)
+        self.assertTrue(fallback_hits.any())
+
+    def _get_stock_data(self, symbol, *responses):
+        """Call get_stock_data with a session replaying responses."""
+        session = FakeSession(*responses)
+        with patch('app._get_session', lambda: session):
+            return self.app.get_stock_data(symbol), session
+
+    def test_get_stock_data_success(self):
+        """Test successful stock data retrieval."""
+        result, session = self._get_stock_data(
+            'AAPL', _chart_response(self.sample_data)
+        )
 
         self.assertIsNotNone(result)
         self.assertIsInstance(result, pd.DataFrame)
-        mock_ticker.assert_called_once_with('AAPL')
-
-    @patch('app.yf.Ticker')
-    @patch('app.requests.Session')
-    def test_get_stock_data_empty_response(self, mock_session, mock_ticker):
-        """Test handling of empty yfinance response."""
-        # Mock empty response
-        mock_ticker_instance = MagicMock()
-        mock_ticker.return_value = mock_ticker_instance
-        mock_ticker_instance.history.return_value = pd.DataFrame()
+        self.assertEqual(self.app.analyze_local_close_highs(result)['date'],
+                         '2025-10-07')
+        self.assertEqual(session.urls, [self.app.CHART_URL.format('AAPL')])
 
-        result = get_stock_data('INVALID')
+    def test_get_stock_data_empty_response(self):
+        """Test handling of a chart response without data."""
+        result, _ = self._get_stock_data(
+            'INVALID', _chart_response(None, status_code=404)
+        )
 
         self.assertIsNone(result)
 
-    @patch('app.yf.Ticker')
-    @patch('app.requests.Session')
-    def test_get_stock_data_exception(self, mock_session, mock_ticker):
+    def test_get_stock_data_exception(self):
         """Test handling of exceptions during data retrieval."""
-        # Mock exception
-        mock_ticker.side_effect = Exception("Network error")
-
-        result = get_stock_data('AAPL')
+        result, _ = self._get_stock_data('AAPL', Exception("Network error"))
 
         self.assertIsNone(result)
 
+    def test_get_stock_data_retries_when_rate_limited(self):
+        """Test rate-limited requests back off and are retried."""
+        delays = []
+
+        with patch('app.add_request_delay', delays.append), \
+                patch('app._BUCKET',
+                      self.app.TokenBucket(rate=1.0)) as bucket:
+            result, session = self._get_stock_data(
+                'AAPL', SimpleNamespace(status_code=429),
+                _chart_response(self.sample_data)
+            )
+
+        self.assertIsNotNone(result)
+        self.assertEqual(len(session.urls), 2)
+        self.assertEqual(delays, [1])
+        # Halved by the 429, then stepped back up by the success
+        self.assertAlmostEqual(bucket.rate, 0.6)
+
+    def test_token_bucket_recovers_base_rate(self):
+        """Test the rate returns to its base after rate limiting ends."""
+        bucket = self.app.TokenBucket(rate=1.0)
+        for _ in range(5):
+            bucket.slow_down()
+        self.assertAlmostEqual(bucket.rate, 0.05)
+
+        for _ in range(10):
+            bucket.speed_up()
+        self.assertEqual(bucket.rate, 1.0)
+
+    def test_get_stock_data_batch_fetches_concurrently(self):
+        """Test batch fetch returns a DataFrame per symbol with data."""
+        session = FakeChartSession({'AAPL': self.sample_data,
+                                    'MSFT': self.sample_data})
+
+        with patch('app._get_async_session', lambda: session), \
+                patch('app._BUCKET', self.app.TokenBucket()):
+            result = self.app.get_stock_data_batch(['AAPL', 'MSFT', 'INVALID'])
+
+        self.assertEqual(sorted(result), ['AAPL', 'MSFT'])
+        self.assertEqual(sorted(session.requested),
+                         ['AAPL', 'INVALID', 'MSFT'])
+        prices, date = result['AAPL']
+        self.assertEqual(prices[:, 2].tolist(), [148.0, 153.0, 151.0])
+        self.assertEqual(date, '2025-10-07')
+
+    def test_get_stock_data_batch_reuses_session(self):
+        """Test repeated batch fetches share one async session."""
+        sessions = []
+
+        def new_session(**kwargs):
+            sessions.append(FakeChartSession({'AAPL': self.sample_data}))
+            return sessions[-1]
+
+        with patch('app.requests.AsyncSession', new_session), \
+                patch('app._async_session', None), \
+                patch('app._BUCKET', self.app.TokenBucket()):
+            for _ in range(2):
+                self.assertIn('AAPL', self.app.get_stock_data_batch(['AAPL']))
+
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0].requested, ['AAPL', 'AAPL'])
+
+    def test_file_cache_round_trip(self):
+        """Test stock data stored in STOCK_CACHE_DIR is read back."""
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch('app.STOCK_CACHE_DIR', cache_dir):
+            self.assertIsNone(self.app.load_cached_stock_data('AAPL'))
+
+            self.app.store_cached_stock_data('AAPL', self.sample_data)
+
+            pd.testing.assert_frame_equal(
+                self.app.load_cached_stock_data('AAPL'), self.sample_data
+            )
+            self.assertIsNone(self.app.load_cached_stock_data('AAPL', ttl=-1))
+
+    def test_file_cache_stores_json(self):
+        """Test cached frames and windows are read back from JSON files."""
+        window = self.app.price_window(self.sample_data)
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch('app.STOCK_CACHE_DIR', cache_dir):
+            self.app.store_cached_stock_data('AAPL', self.sample_data,
+                                             kind='frame')
+            self.app.store_cached_stock_data('AAPL', window)
+
+            for name in os.listdir(cache_dir):
+                with open(os.path.join(cache_dir, name)) as f:
+                    json.load(f)
+
+            # Skip the in-process cache so the files are decoded
+            with patch('app._l1_cache', self.app.OrderedDict()):
+                pd.testing.assert_frame_equal(
+                    self.app.load_cached_stock_data('AAPL', kind='frame'),
+                    self.sample_data
+                )
+                prices, date = self.app.load_cached_stock_data('AAPL')
+
+        np.testing.assert_array_equal(prices, window[0])
+        self.assertEqual(date, window[1])
+
+    def test_cache_skips_unsafe_symbols(self):
+        """Test symbols that could escape the cache directory are skipped."""
+        with tempfile.TemporaryDirectory() as root:
+            cache_dir = os.path.join(root, 'cache')
+            with patch('app.STOCK_CACHE_DIR', cache_dir):
+                self.app.store_cached_stock_data('../../AAPL',
+                                                 self.sample_data)
+                self.assertIsNone(
+                    self.app.load_cached_stock_data('../../AAPL')
+                )
+
+            self.assertEqual(os.listdir(root), [])
+
+    @patch('app._get_redis')
+    def test_in_process_cache_skips_redis(self, mock_get_redis):
+        """Test repeat cache reads are served without a Redis round-trip."""
+        redis_client = mock_get_redis.return_value
+        with patch('app.REDIS_URL', 'redis://localhost:6379/0'), \
+                patch('app._l1_cache', self.app.OrderedDict()):
+            self.app.store_cached_stock_data('MSFT', self.sample_data)
+            for _ in range(2):
+                pd.testing.assert_frame_equal(
+                    self.app.load_cached_stock_data('MSFT'), self.sample_data
+                )
+
+        redis_client.setex.assert_called_once()
+        redis_client.get.assert_not_called()
+
+    @patch('app.get_stock_data_batch')
+    def test_analyze_stocks_keeps_input_order(self, mock_get_batch):
+        """Test analysis returns results in symbol order."""
+        window = self.app.price_window(self.sample_data)
+        mock_get_batch.return_value = {'AAPL': window, 'MSFT': window}
+
+        results = self.app.analyze_stocks(['MSFT', 'BAD', 'AAPL'])
+
+        self.assertEqual([r.symbol for r in results],
+                         ['MSFT'] * 3 + ['AAPL'] * 3)
+
+    @patch('app.publish_to_sns')
+    @patch('app.analyze_stocks')
+    def test_lambda_handler_serializes_once(self, mock_analyze,
+                                            mock_publish):
+        """Test the Lambda response body is reused as the SNS message."""
+        mock_analyze.return_value = [
+            self.app.Pattern('local_close_high', 'AAPL', 151.0, '2024-01-02')
+        ]
+        env = {'AWS_LAMBDA_FUNCTION_NAME': 'daily-high-low',
+               'SNS_TOPIC_ARN': 'arn:aws:sns:us-east-1:123:topic'}
+
+        with patch.dict(os.environ, env):
+            response = self.app.lambda_handler({'symbols': ['AAPL']}, None)
+
+        body = response['body']
+        self.assertEqual(response['statusCode'], 200)
+        mock_publish.assert_called_once_with(
+            mock_analyze.return_value, env['SNS_TOPIC_ARN'], body
+        )
+        self.assertNotIn('\n', body)
+        payload = json.loads(body)
+        self.assertEqual(payload['summary']['close_highs_count'], 1)
+        self.assertEqual(payload['local_close_highs'],
+                         [{'type': 'local_close_high', 'symbol': 'AAPL',
+                           'close_price': 151.0, 'date': '2024-01-02'}])
+
+    @patch('app._get_sns')
+    def test_publish_to_sns_skips_empty_results(self, mock_get_sns):
+        """Test nothing is sent to SNS when no patterns were found."""
+        self.assertTrue(
+            self.app.publish_to_sns([], 'arn:aws:sns:us-east-1:123:topic')
+        )
+        mock_get_sns.assert_not_called()
+
+
+def test_parse_chart_json(sample_data):
+    """Test a v8 chart response is converted to numpy price arrays."""
+    app = _load()
+    prices, timestamps = app.parse_chart_json(_chart_payload(sample_data))
+
+    np.testing.assert_array_equal(
+        prices, sample_data[['High', 'Low', 'Close']].to_numpy()
+    )
+    assert (list(pd.to_datetime(timestamps, unit='s').strftime('%Y-%m-%d'))
+            == ['2025-10-06', '2025-10-07', '2025-10-08'])
+    assert app.parse_chart_json(_chart_payload(None)) is None
+
 
 if __name__ == '__main__':
     unittest.main()
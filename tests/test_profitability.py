@@ -0,0 +1,371 @@
+import unittest
+import sys
+import os
+import io
+import json
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+from functools import lru_cache
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import profitability_analyzer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@lru_cache(maxsize=None)
+def _load():
+    """Import profitability_analyzer on first use; it pulls in yfinance."""
+    import profitability_analyzer
+    return profitability_analyzer
+
+
+def _bars(start, end, close=100.0):
+    """Daily High/Low/Close bars on business days from start to end."""
+    index = pd.bdate_range(start, end)
+    closes = np.full(len(index), close)
+    return pd.DataFrame({'High': closes + 1, 'Low': closes - 1,
+                         'Close': closes}, index=index)
+
+
+def _random_history(rng, n):
+    """Random-walk daily bars, rounded to cents so ties occur."""
+    close = np.round(100 * np.cumprod(1 + rng.normal(0, 0.03, n)), 2)
+    spread = np.round(close * rng.uniform(0, 0.02, (2, n)), 2)
+    return pd.DataFrame({'High': close + spread[0], 'Low': close - spread[1],
+                         'Close': close},
+                        index=pd.bdate_range('2024-01-01', periods=n))
+
+
+def _reference_backtest(pa, data, max_hold_days=10):
+    """
+    Bar-by-bar backtest using the per-index signal helpers.
+
+    Returns:
+        Tuple of (trade returns, max drawdown of the daily capital curve)
+    """
+    closes = data['Close'].to_numpy()
+    returns = []
+    capital = peak = 1.0
+    max_drawdown = 0.0
+    in_position = False
+    entry_price = days_held = 0
+
+    def close_trade(price):
+        returns.append((price - entry_price) / entry_price)
+        return capital * (1 + returns[-1])
+
+    for i in range(1, len(data) - 1):
+        price = closes[i + 1]
+        if in_position and days_held >= max_hold_days:
+            capital = close_trade(price)
+            in_position = False
+
+        if not in_position:
+            if (pa.detect_local_extreme_low_historical(data, i)
+                    or pa.detect_local_close_low_historical(data, i)):
+                in_position, entry_price, days_held = True, price, 0
+        else:
+            days_held += 1
+            if (pa.detect_local_extreme_high_historical(data, i)
+                    or pa.detect_local_close_high_historical(data, i)):
+                capital = close_trade(price)
+                in_position = False
+
+        peak = max(peak, capital)
+        max_drawdown = max(max_drawdown, (peak - capital) / peak)
+
+    return returns, max_drawdown
+
+
+def _at(*args):
+    """Patch profitability_analyzer's clock to the given datetime."""
+    now = datetime(*args)
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    return patch('profitability_analyzer.datetime', Clock)
+
+
+class SerialExecutor:
+    """Stand-in for ProcessPoolExecutor running tasks in this process."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+class FakeMarket:
+    """Stand-in for yf.download serving group_by='ticker' frames."""
+
+    def __init__(self, histories):
+        self.histories = histories
+        self.calls = []
+
+    def download(self, tickers, start, end, **kwargs):
+        self.calls.append((list(tickers), pd.Timestamp(start)))
+        frames = {symbol: data[(data.index >= start) & (data.index < end)]
+                  for symbol, data in self.histories.items()
+                  if symbol in tickers}
+        return pd.concat(frames, axis=1)
+
+
+class TestBacktest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pa = _load()
+        # The compiled kernel and the plain-Python function it wraps
+        cls.kernels = {'default': cls.pa._simulate,
+                       'python': getattr(cls.pa._simulate, 'py_func',
+                                         cls.pa._simulate)}
+
+    def test_simulation_matches_reference_loop(self):
+        """Test the fused kernel trades like a bar-by-bar reference loop."""
+        rng = np.random.default_rng(1)
+        for name, kernel in self.kernels.items():
+            for trial in range(50):
+                data = _random_history(rng, int(rng.integers(5, 300)))
+                returns, max_drawdown = _reference_backtest(self.pa, data)
+                with self.subTest(kernel=name, trial=trial), \
+                        patch('profitability_analyzer._simulate', kernel):
+                    result = self.pa.simulate_trading_strategy(
+                        data, 'TEST', filter_extremes=False,
+                        requested_days=len(data)
+                    )
+
+                    self.assertEqual(result.total_trades, len(returns))
+                    if returns:
+                        np.testing.assert_allclose(
+                            (result.total_return, result.max_drawdown,
+                             result.avg_return_per_trade),
+                            (np.prod(np.add(returns, 1)) - 1, max_drawdown,
+                             np.mean(returns)),
+                            atol=1e-12
+                        )
+
+    def test_max_drawdown_over_equity_curve(self):
+        """Test drawdown is measured from the running equity peak."""
+        # Trades return +10%, -20%, +5%: peak 1.1, trough 0.88
+        closes = [10, 9, 10, 12, 11, 9, 10, 11, 8, 10, 11, 10.5, 10.5]
+        data = pd.DataFrame({'High': closes, 'Low': closes,
+                             'Close': closes}, dtype=float,
+                            index=pd.bdate_range('2024-01-01',
+                                                 periods=len(closes)))
+
+        result = self.pa.simulate_trading_strategy(
+            data, 'TEST', filter_extremes=False, requested_days=len(data)
+        )
+
+        self.assertEqual(result.total_trades, 3)
+        self.assertAlmostEqual(result.max_drawdown, 0.2)
+        self.assertAlmostEqual(result.total_return, 1.1 * 0.8 * 1.05 - 1)
+
+    def test_main_prints_notes_with_their_symbol(self):
+        """Test filtering notes from the workers follow their symbol."""
+        jumpy = _bars('2024-01-01', '2024-02-09')
+        jumpy.iloc[15:] *= 1.5
+        histories = {'AAA': _bars('2024-01-01', '2024-02-09'), 'BBB': jumpy}
+
+        output = io.StringIO()
+        with patch('profitability_analyzer.ProcessPoolExecutor',
+                   SerialExecutor), \
+                patch('profitability_analyzer.read_candidate_stocks_csv',
+                      return_value=['AAA', 'BBB']), \
+                patch('profitability_analyzer.'
+                      'get_historical_stock_data_batch',
+                      return_value=histories), \
+                patch('profitability_analyzer.save_results_to_json'), \
+                redirect_stdout(output):
+            self.pa.main(lookback_days=20)
+
+        progress = output.getvalue().split('\n[')
+        self.assertNotIn('Filtered out', progress[1])
+        self.assertTrue(progress[2].startswith('2/2] Analyzing BBB... '))
+        self.assertIn('Filtered out 5 days', progress[2])
+        self.assertIn('reduced from 30 to 25 days', progress[2])
+
+    def test_filter_extreme_events(self):
+        """Test extreme days and two days either side are dropped."""
+        data = _bars('2024-01-01', '2024-01-16')
+        data.iloc[6:, data.columns.get_loc('Close')] = 130.0
+
+        filtered = self.pa.filter_extreme_events(data)
+
+        self.assertEqual(list(filtered.index),
+                         list(data.index[:4]) + list(data.index[9:]))
+        # Too short to filter, or nothing to filter
+        for unchanged in (data.iloc[:4], _bars('2024-01-01', '2024-01-16')):
+            self.assertIs(self.pa.filter_extreme_events(unchanged), unchanged)
+
+
+class TestHistoryData(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pa = _load()
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = patch('profitability_analyzer.HISTORY_CACHE_DIR',
+                        cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fetch(self, market, *now):
+        """Fetch AAPL's history at the given time from market."""
+        with _at(*now), patch('profitability_analyzer.yf.download',
+                              market.download):
+            return self.pa.get_historical_stock_data_batch(['AAPL'],
+                                                           days=20)
+
+    def test_download_splits_batches_by_ticker(self):
+        """Test batched downloads are split into per-symbol frames."""
+        bars = _bars('2025-10-01', '2025-10-10').assign(Volume=1e6)
+        raw = pd.concat({'AAPL': bars, 'DEAD': bars * np.nan}, axis=1)
+        start, end = datetime(2025, 10, 1), datetime(2025, 10, 11)
+
+        with patch('profitability_analyzer.DOWNLOAD_BATCH_SIZE', 3), \
+                patch('profitability_analyzer.yf.download',
+                      side_effect=[raw, bars]) as download:
+            histories = self.pa._download_histories(
+                ['AAPL', 'DEAD', 'MISSING', 'MSFT'], start, end, None
+            )
+
+        self.assertEqual([call.args[0] for call in download.call_args_list],
+                         [['AAPL', 'DEAD', 'MISSING'], ['MSFT']])
+        # MSFT came back alone with flat single-ticker columns
+        self.assertEqual(sorted(histories), ['AAPL', 'MSFT'])
+        for data in histories.values():
+            self.assertEqual(list(data.columns), self.pa.PRICE_COLUMNS)
+            self.assertTrue((data.dtypes == np.float64).all())
+            pd.testing.assert_index_equal(data.index, bars.index)
+
+    def test_partial_bar_is_refetched(self):
+        """Test an intraday bar is not cached and is replaced after close."""
+        # 11:00 on 10-14: today's bar is still in progress
+        market = FakeMarket({'AAPL': _bars('2025-09-01', '2025-10-14')})
+        market.histories['AAPL'].loc['2025-10-14', 'Close'] = 1.0
+        self.assertEqual(
+            self._fetch(market, 2025, 10, 14, 11)['AAPL']['Close'].iloc[-1],
+            1.0
+        )
+
+        # After the close on 10-15
+        market.histories['AAPL'] = _bars('2025-09-01', '2025-10-15')
+        market.histories['AAPL'].loc['2025-10-14', 'Close'] = 2.0
+        data = self._fetch(market, 2025, 10, 15, 17)['AAPL']
+
+        self.assertEqual(data.loc['2025-10-14', 'Close'], 2.0)
+        self.assertEqual(data.index[-1], pd.Timestamp('2025-10-15'))
+        self.assertFalse(data.index.duplicated().any())
+        # Only the tail from the last completed cached day was downloaded
+        self.assertEqual(market.calls[-1],
+                         (['AAPL'], pd.Timestamp('2025-10-13')))
+
+    def test_readjusted_history_is_downloaded_again(self):
+        """Test cached prices are replaced when Yahoo re-adjusts them."""
+        market = FakeMarket({'AAPL': _bars('2025-09-01', '2025-10-14')})
+        self._fetch(market, 2025, 10, 15, 17)
+
+        # A 2:1 split halves every back-adjusted price
+        market.histories['AAPL'] = _bars('2025-09-01', '2025-10-15', 50.0)
+        data = self._fetch(market, 2025, 10, 15, 18)['AAPL']
+
+        self.assertEqual(len(market.calls), 3)
+        self.assertEqual(market.calls[-1][1], pd.Timestamp('2025-09-15 18:00'))
+        np.testing.assert_array_equal(data['Close'].unique(), [50.0])
+        self.assertEqual(data.index[-1], pd.Timestamp('2025-10-15'))
+
+    def test_cache_round_trips_through_json(self):
+        """Test cached histories are JSON files read back unchanged."""
+        market = FakeMarket({'AAPL': _bars('2025-09-01', '2025-10-14')})
+        fetched = self._fetch(market, 2025, 10, 15, 17)['AAPL']
+
+        path = self.pa._history_cache_file('AAPL')
+        with open(path) as f:
+            self.assertEqual(sorted(json.load(f)),
+                             ['columns', 'index', 'index_dtype', 'start'])
+        with _at(2025, 10, 15, 17):
+            cached = self.pa._load_cached_history(
+                'AAPL', datetime(2025, 9, 15, 17)
+            )
+        pd.testing.assert_frame_equal(cached, fetched, check_freq=False)
+
+    def test_cache_skips_unsafe_symbols(self):
+        """Test symbols that could escape the cache directory are skipped."""
+        market = FakeMarket({'../x': _bars('2025-09-01', '2025-10-14')})
+        with tempfile.TemporaryDirectory() as root:
+            cache_dir = os.path.join(root, 'cache')
+            with patch('profitability_analyzer.HISTORY_CACHE_DIR',
+                       cache_dir), \
+                    _at(2025, 10, 15, 17), \
+                    patch('profitability_analyzer.yf.download',
+                          market.download):
+                histories = self.pa.get_historical_stock_data_batch(
+                    ['../x'], days=20
+                )
+
+            self.assertIn('../x', histories)
+            self.assertEqual(os.listdir(root), [])
+
+
+class TestSymbolFiles(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pa = _load()
+
+    def _write_csv(self, text):
+        """Write text to a temporary CSV file and return its path."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv',
+                                         delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_read_candidate_stocks_csv(self):
+        """Test symbols are cleaned and comments and blanks skipped."""
+        path = self._write_csv("symbol,name\n aapl ,Apple\n#MSFT,Comment\n"
+                               ",Blank\nbrk.b,Berkshire\n")
+
+        self.assertEqual(self.pa.read_candidate_stocks_csv(path),
+                         ['AAPL', 'BRK.B'])
+
+    def test_read_cboe_symbols_csv(self):
+        """Test CBOE symbols drop ETFs and long instrument codes."""
+        path = self._write_csv("Stock Symbol,Company Name\n"
+                               "SPY,SPDR S&P 500 ETF Trust\n"
+                               "AAPL,Apple Inc.\n"
+                               "IBIT,iShares Bitcoin Trust\n"
+                               "ABCDEF,Long Symbol Corp\n"
+                               "NA,National Bank\n")
+
+        self.assertEqual(self.pa.read_cboe_symbols_csv(path), ['AAPL', 'NA'])
+
+    def test_reader_cache_follows_file_changes(self):
+        """Test a rewritten symbol file is read again."""
+        path = self._write_csv("symbol\nAAPL\n")
+        self.assertEqual(self.pa.read_candidate_stocks_csv(path), ['AAPL'])
+
+        with open(path, 'w') as f:
+            f.write("symbol\nMSFT\n")
+        mtime = os.path.getmtime(path) + 1
+        os.utime(path, (mtime, mtime))
+
+        self.assertEqual(self.pa.read_candidate_stocks_csv(path), ['MSFT'])
+
+
+if __name__ == '__main__':
+    unittest.main()